@@ -1,8 +1,129 @@
-def get_weather_icon(temp):
-    temp = float(temp)
-    if temp < 25:
-        return "🧊"
-    elif temp < 30:
-        return "🌤️"
-    else:
-        return "🔥"
+import threading
+
+import numpy as np
+import pandas as pd
+
+from qc import nettoyer
+from schema import apres_filigranes, avancer_filigranes, normaliser
+
+
+def get_weather_icon(temp):
+    temp = float(temp)
+    if temp < 25:
+        return "🧊"
+    elif temp < 30:
+        return "🌤️"
+    else:
+        return "🔥"
+
+
+def icones_temperature(temperatures):
+    """Version vectorisée de get_weather_icon pour une série de températures."""
+    t = np.asarray(temperatures, dtype="float64")
+    return np.select([t < 25, t < 30, t >= 30], ["🧊", "🌤️", "🔥"], default="")
+
+
+# Règles d'alerte : "seuil" compare la valeur, "variation" compare l'écart avec
+# la plus ancienne valeur de la station dans la fenêtre
+REGLES = [
+    {"nom": "Chaleur", "param": "AIR TEMPERATURE", "type": "seuil", "op": ">=", "valeur": 33, "niveau": "orange"},
+    {"nom": "Humidité saturée", "param": "HUMIDITY", "type": "seuil", "op": ">", "valeur": 98, "niveau": "jaune"},
+    {"nom": "Vent fort", "param": "WIND SPEED", "type": "seuil", "op": ">=", "valeur": 15, "niveau": "orange"},
+    {"nom": "Rafale", "param": "WIND SPEED", "type": "variation", "fenetre": "10min", "op": ">=", "valeur": 8,
+     "niveau": "orange"},
+    {"nom": "Chute de pression", "param": "AIR PRESSURE", "type": "variation", "fenetre": "3h", "op": "<=",
+     "valeur": -3, "niveau": "rouge"},
+    {"nom": "Surcote", "param": "SURGE", "type": "seuil", "op": ">=", "valeur": 0.5, "niveau": "rouge"},
+]
+
+OPERATEURS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}
+COLONNES_ALERTES = ["Station", "Règle", "Paramètre", "Valeur", "Niveau"]
+MAX_HISTORIQUE = 10000
+
+
+def variation(df, param, fenetre):
+    """Écart de `param` avec la plus ancienne valeur de la même station dans `fenetre`."""
+    resultat = np.full(len(df), np.nan)
+    temps = df.index.values
+    valeurs = df[param].to_numpy(dtype="float64")
+    codes = df["Station"].cat.codes.to_numpy()
+    # Une recherche dichotomique par station, pas de boucle sur les lignes
+    for code in np.unique(codes):
+        positions = np.flatnonzero(codes == code)
+        t = temps[positions]
+        debut = np.searchsorted(t, t - pd.Timedelta(fenetre).to_timedelta64(), "left")
+        resultat[positions] = valeurs[positions] - valeurs[positions][debut]
+    return resultat
+
+
+def evaluer(df, regles=REGLES):
+    """Évalue toutes les règles sur un tableau normalisé, en une passe par règle."""
+    morceaux = []
+    for regle in regles:
+        if regle["param"] not in df.columns:
+            continue
+        if regle["type"] == "variation":
+            valeurs = variation(df, regle["param"], regle["fenetre"])
+        else:
+            valeurs = df[regle["param"]].to_numpy(dtype="float64")
+        # Les NaN ne déclenchent jamais d'alerte
+        masque = OPERATEURS[regle["op"]](valeurs, regle["valeur"])
+        if masque.any():
+            morceaux.append(pd.DataFrame({
+                "Station": df["Station"].to_numpy()[masque],
+                "Règle": regle["nom"],
+                "Paramètre": regle["param"],
+                "Valeur": valeurs[masque],
+                "Niveau": regle["niveau"],
+            }, index=df.index[masque]))
+    if not morceaux:
+        return pd.DataFrame(columns=COLONNES_ALERTES, index=pd.DatetimeIndex([], name="DateTime"))
+    return pd.concat(morceaux).sort_index(kind="stable")
+
+
+class MoteurAlertes:
+    """Évalue les règles au fil des rafraîchissements, sur les seules lignes nouvelles.
+
+    Une queue d'historique (la plus longue fenêtre de variation) est gardée
+    pour que les règles de variation voient les valeurs précédentes.
+    - `historique` : alertes déclenchées, les plus récentes en dernier ;
+    - `etat` : règles actives sur la dernière observation de chaque station.
+    """
+
+    def __init__(self, regles=REGLES):
+        self.regles = regles
+        self.filigranes = {}
+        self.historique = evaluer(pd.DataFrame(), [])
+        self.etat = {}
+        self._contexte = None
+        self._fenetre = max([pd.Timedelta(r["fenetre"]) for r in regles if r["type"] == "variation"],
+                            default=pd.Timedelta(0))
+        self._lock = threading.Lock()
+
+    def update(self, delta):
+        # Stockage vide au premier démarrage : tableau sans colonnes
+        if delta.empty:
+            return
+        with self._lock:
+            nouveau = apres_filigranes(delta, self.filigranes)
+            if nouveau.empty:
+                return
+            anciens = dict(self.filigranes)
+            donnees = nouveau if self._contexte is None else normaliser(pd.concat([self._contexte, nouveau]))
+            # Seules les alertes des lignes nouvelles sont retenues ; une valeur
+            # marquée par le contrôle qualité (pic, capteur bloqué) n'en déclenche pas
+            alertes = apres_filigranes(evaluer(nettoyer(donnees), self.regles), anciens)
+            avancer_filigranes(nouveau, self.filigranes)
+
+            if not alertes.empty:
+                # Pas de concaténation avec un historique vide (FutureWarning de pandas 2)
+                historique = [self.historique, alertes] if not self.historique.empty else [alertes]
+                self.historique = pd.concat(historique).iloc[-MAX_HISTORIQUE:]
+            etat = dict(self.etat)
+            for station in nouveau["Station"].unique():
+                etat[station] = []
+            dernieres = alertes[alertes.index == alertes["Station"].map(self.filigranes).to_numpy()]
+            for station, regles in dernieres.groupby("Station", observed=True)["Règle"]:
+                etat[station] = list(regles)
+            self.etat = etat
+            self._contexte = donnees.loc[donnees.index.max() - self._fenetre:]
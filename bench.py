@@ -0,0 +1,201 @@
+"""Banc d'essai hors ligne de la chaîne de données du tableau de bord.
+
+Génère des observations synthétiques au format de l'API, puis chronomètre
+chaque étape de site_PAD.py (lecture JSON, dates, normalisation, contrôle
+qualité, filtrage, dernière observation par station, figure, export) sans
+serveur Streamlit.
+Le résultat est écrit en JSON : débit (lignes/s) et pic mémoire par étape.
+
+    python bench.py --echelle petit
+    python bench.py --stations 50 --jours 3650 --pas 10min --sortie bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from alerte import evaluer
+from downsample import reduire_par_station
+from export import exporter
+from qc import controler
+from rollups import Rollups
+from schema import normaliser
+from timeindex import TimeIndex
+
+# Échelles prédéfinies : (stations, jours, pas de temps)
+ECHELLES = {
+    "petit": (5, 7, "1min"),
+    "moyen": (20, 90, "1min"),
+    "grand": (50, 365, "5min"),
+    "max": (50, 3650, "10min"),
+}
+# Au-delà, le texte JSON ne tient plus raisonnablement en mémoire : étape sautée
+LIMITE_JSON = 5_000_000
+
+
+def generer(n_stations, jours, pas="1min", graine=0):
+    """Observations synthétiques réalistes, colonnes et types texte de l'API."""
+    rng = np.random.default_rng(graine)
+    temps = pd.date_range("2015-01-01", periods=int(pd.Timedelta(days=jours) / pd.Timedelta(pas)), freq=pas)
+    n = len(temps) * n_stations
+    t = np.tile(temps.values, n_stations)
+    stations = np.repeat([f"PAD-{i + 1}" for i in range(n_stations)], len(temps))
+    heures = (t - t.min()) / np.timedelta64(1, "h")
+    # Marée semi-diurne (M2 + S2), cycle diurne de température et d'humidité
+    maree = 1.6 + 0.9 * np.sin(2 * np.pi * heures / 12.42) + 0.3 * np.sin(2 * np.pi * heures / 12.0)
+    diurne = np.sin(2 * np.pi * (heures % 24) / 24)
+    colonnes = {
+        "Station": stations,
+        "Latitude": np.repeat(4.0 + rng.uniform(-0.1, 0.1, n_stations), len(temps)).round(4),
+        "Longitude": np.repeat(9.7 + rng.uniform(-0.1, 0.1, n_stations), len(temps)).round(4),
+        "DateTime": pd.DatetimeIndex(t).strftime("%Y-%m-%d %H:%M:%S"),
+        "TIDE HEIGHT": (maree + rng.normal(0, 0.05, n)).round(2),
+        "WIND SPEED": np.abs(4 + 2 * diurne + rng.normal(0, 1.5, n)).round(1),
+        "WIND DIR": rng.uniform(0, 360, n).round(0),
+        "AIR PRESSURE": (1010 + 2 * np.sin(2 * np.pi * heures / 12) + rng.normal(0, 0.3, n)).round(1),
+        "AIR TEMPERATURE": (27 + 3 * diurne + rng.normal(0, 0.5, n)).round(1),
+        "DEWPOINT": (23 + rng.normal(0, 0.5, n)).round(1),
+        "HUMIDITY": np.clip(85 - 10 * diurne + rng.normal(0, 3, n), 40, 100).round(0),
+        "SURGE": rng.normal(0.05, 0.1, n).round(2),
+    }
+    df = pd.DataFrame(colonnes)
+    # L'API envoie les mesures sous forme de texte
+    for col in ["TIDE HEIGHT", "WIND SPEED", "WIND DIR", "AIR PRESSURE", "AIR TEMPERATURE",
+                "DEWPOINT", "HUMIDITY", "SURGE"]:
+        df[col] = df[col].astype(str)
+    return df
+
+
+def mesurer(fonction, repetitions):
+    """Durée minimale sur `repetitions` exécutions, puis pic mémoire d'une exécution tracée."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+    tracemalloc.start()
+    fonction()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultat, min(durees), pic
+
+
+def etapes(brut, dossier):
+    """Étapes dans l'ordre de site_PAD.py ; chacune reçoit le résultat de la précédente."""
+    etat = {}
+
+    def parse():
+        if len(brut) > LIMITE_JSON:
+            return None
+        if "json" not in etat:
+            etat["json"] = brut.to_json(orient="records")
+        return pd.DataFrame(json.loads(etat["json"]))
+
+    def dates():
+        return pd.to_datetime(brut["DateTime"])
+
+    def normalisation():
+        etat["df"] = normaliser(brut)
+        return etat["df"]
+
+    def qualite():
+        return controler(etat["df"])
+
+    def filtrage():
+        df = etat["df"]
+        index = TimeIndex(df)
+        debut = df.index[len(df) // 2]
+        fin = df.index[-1]
+        index.slice(debut, fin)
+        etat["index"] = index
+        return index.slice(debut, fin, stations=index.stations[:1])
+
+    def dernier_par_station():
+        return etat["index"].latest()
+
+    def rollups():
+        return Rollups().update(etat["df"])
+
+    def alertes():
+        return evaluer(etat["df"])
+
+    def figure():
+        import plotly.express as px
+        df = reduire_par_station(etat["df"].dropna(subset=["TIDE HEIGHT"]), "TIDE HEIGHT")
+        return px.line(df, x=df.index, y="TIDE HEIGHT", color="Station")
+
+    def export_csv():
+        df = etat["df"]
+        blocs = (groupe for _, groupe in df.groupby(df.index.date))
+        chemin = exporter(blocs, "csv.gz", dossier=dossier)
+        os.remove(chemin)
+
+    return [("parse", parse), ("dates", dates), ("normalisation", normalisation), ("qualite", qualite),
+            ("filtrage", filtrage), ("dernier_par_station", dernier_par_station), ("rollups", rollups),
+            ("alertes", alertes), ("figure", figure), ("export_csv", export_csv)]
+
+
+def executer(n_stations, jours, pas, repetitions=1):
+    brut = generer(n_stations, jours, pas)
+    lignes = len(brut)
+    dossier = tempfile.mkdtemp(prefix="meteo-bench-")
+    resultats = []
+    try:
+        for nom, fonction in etapes(brut, dossier):
+            try:
+                resultat, duree, pic = mesurer(fonction, repetitions)
+            except ImportError as e:
+                resultats.append({"etape": nom, "ignoree": str(e)})
+                continue
+            if nom == "parse" and resultat is None:
+                resultats.append({"etape": nom, "ignoree": f"plus de {LIMITE_JSON} lignes"})
+                continue
+            resultats.append({
+                "etape": nom,
+                "secondes": round(duree, 6),
+                "lignes_par_seconde": round(lignes / duree) if duree > 0 else None,
+                "pic_memoire_mo": round(pic / 2 ** 20, 2),
+            })
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+    return {
+        "stations": n_stations,
+        "jours": jours,
+        "pas": pas,
+        "lignes": lignes,
+        "repetitions": repetitions,
+        "etapes": resultats,
+        # ru_maxrss est en Ko sous Linux
+        "rss_max_mo": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--echelle", choices=ECHELLES, default="petit")
+    parser.add_argument("--stations", type=int)
+    parser.add_argument("--jours", type=int)
+    parser.add_argument("--pas")
+    parser.add_argument("--repetitions", type=int, default=1)
+    parser.add_argument("--sortie", help="fichier JSON de sortie (par défaut : sortie standard)")
+    args = parser.parse_args()
+
+    n_stations, jours, pas = ECHELLES[args.echelle]
+    rapport = executer(args.stations or n_stations, args.jours or jours, args.pas or pas, args.repetitions)
+    texte = json.dumps(rapport, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(texte + "\n")
+    else:
+        print(texte)
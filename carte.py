@@ -0,0 +1,168 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from alerte import icones_temperature
+
+CENTRE = [4.05, 9.68]
+
+# Colonne -> (champ du gabarit, format) ; les valeurs manquantes s'affichent "–"
+CHAMPS = {
+    "AIR TEMPERATURE": ("temperature", "%.1f"),
+    "HUMIDITY": ("humidite", "%.0f"),
+    "WIND SPEED": ("vent", "%.1f"),
+    "AIR PRESSURE": ("pression", "%.1f"),
+    "TIDE HEIGHT": ("maree", "%.2f"),
+    "SURGE": ("surge", "%.2f"),
+}
+
+POPUP = """
+<div style="width: 250px;">
+    <h4>📍 {station}</h4>
+    <p><b>Date :</b> {date}</p>
+    <p><b>Température :</b> {temperature} °C</p>
+    <p><b>Vent :</b> {vent} m/s</p>
+    <p><b>Humidité :</b> {humidite} %</p>
+    <p><b>Pression :</b> {pression} hPa</p>
+    {alertes}{ecarts}
+</div>
+"""
+POPUP_ALERTES = "<p><b>🚨 Alertes :</b> {}</p>"
+POPUP_ECARTS = "<p><b>📊 Écarts :</b> {}</p>"
+
+CARTE_APERCU = """
+#### 📍 Station {station}
+- 🕒 Observation : {date}
+- 🌡️ Température : {temperature}°C {icone}
+- 💧 Humidité : {humidite}% {goutte}
+- 💨 Vent : {vent} m/s
+- 🧭 Pression : {pression} hPa
+- 🌊 Marée : {maree} m
+- ⚠️ SURGE : {surge} m
+{alertes}{ecarts}"""
+APERCU_ALERTES = "- 🚨 Alertes : {}\n"
+APERCU_ECARTS = "- 📊 Écarts : {}\n"
+
+
+def champs(derniers):
+    """Champs des gabarits pour chaque ligne, formatés colonne par colonne (sans boucle sur les lignes)."""
+    n = len(derniers)
+    colonnes = {
+        "station": derniers["Station"].astype(str).to_numpy(),
+        "date": np.asarray(derniers.index.strftime("%Y-%m-%d %H:%M:%S")),
+    }
+    for col, (nom, fmt) in CHAMPS.items():
+        if col not in derniers.columns:
+            colonnes[nom] = np.full(n, "–")
+            continue
+        valeurs = derniers[col].to_numpy(dtype="float64")
+        texte = np.char.mod(fmt, valeurs).astype(object)
+        texte[np.isnan(valeurs)] = "–"
+        colonnes[nom] = texte
+    if "AIR TEMPERATURE" in derniers.columns:
+        colonnes["icone"] = icones_temperature(derniers["AIR TEMPERATURE"])
+    else:
+        colonnes["icone"] = np.full(n, "")
+    return [dict(zip(colonnes, valeurs)) for valeurs in zip(*colonnes.values())]
+
+
+def a_jour(derniers, etat, filigranes):
+    """Entrées de `etat` (alertes ou écarts par station) des seules stations dont la ligne de
+    `derniers` est la dernière observation traitée par le moteur (son filigrane).
+
+    Sur une plage passée, l'état courant ne décrit pas l'observation affichée.
+    """
+    dates = dict(zip(derniers["Station"].astype(str).tolist(), derniers.index))
+    return {station: valeur for station, valeur in etat.items()
+            if station in dates and filigranes.get(station) == dates[station]}
+
+
+class CacheRendus:
+    """Rendu des gabarits par station, refait seulement quand sa dernière ligne change.
+
+    La clé d'une station est l'horodatage de sa dernière observation, ses
+    alertes actives et ses écarts aux statistiques glissantes. Les stations
+    dont la clé a changé sont formatées ensemble, en une passe par colonne.
+    """
+
+    def __init__(self, rendre):
+        self._rendre = rendre
+        self._rendus = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cles(derniers, alertes_actives, ecarts):
+        return [(station, date_obs, tuple(alertes_actives.get(station, [])), tuple(ecarts.get(station, [])))
+                for station, date_obs in zip(derniers["Station"].astype(str).tolist(), derniers.index.asi8.tolist())]
+
+    def rendus(self, derniers, alertes_actives, ecarts=None):
+        """Liste de (station, rendu), dans l'ordre de `derniers`."""
+        cles = self.cles(derniers, alertes_actives, ecarts or {})
+        with self._lock:
+            a_refaire = [i for i, cle in enumerate(cles) if self._rendus.get(cle[0], (None,))[0] != cle]
+            if a_refaire:
+                for i, valeurs in zip(a_refaire, champs(derniers.iloc[a_refaire])):
+                    _, _, alertes, badges = cles[i]
+                    self._rendus[cles[i][0]] = (cles[i], self._rendre(valeurs, alertes, badges))
+            return [(cle[0], self._rendus[cle[0]][1]) for cle in cles]
+
+
+def rendre_popup(valeurs, alertes, ecarts):
+    return POPUP.format(**valeurs,
+                        alertes=POPUP_ALERTES.format(", ".join(alertes)) if alertes else "",
+                        ecarts=POPUP_ECARTS.format("<br>".join(ecarts)) if ecarts else "")
+
+
+def rendre_apercu(valeurs, alertes, ecarts):
+    return CARTE_APERCU.format(**valeurs, goutte="🔴" if "Humidité saturée" in alertes else "💧",
+                               alertes=APERCU_ALERTES.format(", ".join(alertes)) if alertes else "",
+                               ecarts=APERCU_ECARTS.format(", ".join(ecarts)) if ecarts else "")
+
+
+class CacheCarte:
+    """Carte des stations rendue en HTML une seule fois par empreinte.
+
+    L'empreinte réunit les clés de toutes les stations (voir CacheRendus).
+    Tant qu'elle ne change pas, le HTML déjà rendu est réutilisé tel quel ;
+    sinon seuls les popups et marqueurs des stations modifiées sont
+    reconstruits avant un nouveau rendu.
+    """
+
+    def __init__(self, taille=8):
+        self.taille = taille
+        self.popups = CacheRendus(rendre_popup)
+        self._marqueurs = {}
+        self._rendus = OrderedDict()
+        self._lock = threading.Lock()
+
+    def html(self, derniers, alertes_actives, ecarts=None, hauteur=500):
+        ecarts = ecarts or {}
+        empreinte = tuple(CacheRendus.cles(derniers, alertes_actives, ecarts))
+        with self._lock:
+            if empreinte in self._rendus:
+                self._rendus.move_to_end(empreinte)
+                return self._rendus[empreinte]
+
+            # Import différé : folium n'est chargé qu'au premier rendu de la carte
+            import folium
+            m = folium.Map(location=CENTRE, zoom_start=10, height=hauteur)
+            popups = self.popups.rendus(derniers, alertes_actives, ecarts)
+            positions = zip(derniers["Latitude"].tolist(), derniers["Longitude"].tolist())
+            for cle, (station, popup), (lat, lon) in zip(empreinte, popups, positions):
+                cache = self._marqueurs.get(station)
+                if cache is None or cache[0] != cle:
+                    marqueur = folium.Marker(
+                        location=[lat, lon],
+                        popup=folium.Popup(popup, max_width=300),
+                        tooltip=station,
+                        icon=folium.Icon(color="red" if cle[2] else "blue", icon="cloud")
+                    )
+                    cache = self._marqueurs[station] = (cle, marqueur)
+                cache[1].add_to(m)
+
+            html = m.get_root().render()
+            self._rendus[empreinte] = html
+            if len(self._rendus) > self.taille:
+                self._rendus.popitem(last=False)
+            return html
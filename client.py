@@ -0,0 +1,161 @@
+import asyncio
+import codecs
+import json
+import os
+import random
+
+import aiohttp
+import pandas as pd
+
+from schema import normaliser, vide
+
+# Délais en secondes ; une instance Render en veille met plusieurs dizaines de secondes à répondre
+TIMEOUT = float(os.environ.get("METEO_API_TIMEOUT", "60"))
+TENTATIVES = int(os.environ.get("METEO_API_TENTATIVES", "4"))
+PAGE = int(os.environ.get("METEO_API_PAGE", "5000"))
+CONCURRENCE = int(os.environ.get("METEO_API_CONCURRENCE", "4"))
+# Lignes décodées avant conversion en colonnes typées
+TAILLE_LOT = 10000
+
+_decodeur = json.JSONDecoder()
+
+
+class ErreurAPI(Exception):
+    pass
+
+
+class LecteurJSON:
+    """Décode un tableau JSON d'objets au fil des morceaux reçus.
+
+    Les objets complets sont rangés par colonne, puis convertis en lots
+    typés (schema.normaliser) tous les `taille_lot` objets : le corps de la
+    réponse n'est jamais gardé entier en mémoire.
+    """
+
+    def __init__(self, taille_lot=TAILLE_LOT):
+        self.taille_lot = taille_lot
+        self.lots = []
+        self.n = 0
+        self._texte = codecs.getincrementaldecoder("utf-8")()
+        self._tampon = ""
+        self._debut = False
+        self._fin = False
+        self._colonnes = {}
+        self._n_lot = 0
+
+    def alimenter(self, morceau):
+        self._tampon += self._texte.decode(morceau)
+        pos = 0
+        tampon = self._tampon
+        while not self._fin:
+            while pos < len(tampon) and tampon[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(tampon):
+                break
+            if not self._debut:
+                if tampon[pos] != "[":
+                    raise ErreurAPI("réponse inattendue : tableau JSON attendu")
+                self._debut = True
+                pos += 1
+                continue
+            if tampon[pos] == "]":
+                self._fin = True
+                break
+            try:
+                objet, pos_suivante = _decodeur.raw_decode(tampon, pos)
+            except json.JSONDecodeError:
+                # Objet incomplet : la suite arrive avec le prochain morceau
+                break
+            pos = pos_suivante
+            self._ajouter(objet)
+        self._tampon = tampon[pos:]
+
+    def terminer(self):
+        self.alimenter(b"")
+        if not self._fin:
+            raise ErreurAPI("réponse JSON tronquée")
+        self._vider()
+        return pd.concat(self.lots) if self.lots else vide()
+
+    def _ajouter(self, objet):
+        for cle in objet.keys() - self._colonnes.keys():
+            # Colonne apparue en cours de lot : les lignes précédentes n'en ont pas
+            self._colonnes[cle] = [None] * self._n_lot
+        for cle, valeurs in self._colonnes.items():
+            valeurs.append(objet.get(cle))
+        self._n_lot += 1
+        self.n += 1
+        if self._n_lot >= self.taille_lot:
+            self._vider()
+
+    def _vider(self):
+        if self._n_lot:
+            self.lots.append(normaliser(pd.DataFrame(self._colonnes)))
+        self._colonnes = {cle: [] for cle in self._colonnes}
+        self._n_lot = 0
+
+
+async def _page(session, base_url, limit, offset, tentatives=TENTATIVES):
+    """Une page de /donnees, avec nouvelles tentatives espacées exponentiellement."""
+    params = {"limit": limit, "offset": offset}
+    for tentative in range(tentatives):
+        try:
+            async with session.get(f"{base_url}/donnees", params=params) as reponse:
+                # 5xx (démarrage à froid, surcharge) : on réessaie ; 4xx : inutile
+                if reponse.status >= 500:
+                    raise ErreurAPI(f"HTTP {reponse.status}")
+                reponse.raise_for_status()
+                lecteur = LecteurJSON()
+                async for morceau in reponse.content.iter_chunked(1 << 16):
+                    lecteur.alimenter(morceau)
+                return lecteur.terminer(), lecteur.n
+        except (aiohttp.ClientError, asyncio.TimeoutError, ErreurAPI) as e:
+            if isinstance(e, aiohttp.ClientResponseError) and e.status < 500:
+                raise
+            if tentative == tentatives - 1:
+                raise ErreurAPI(f"{base_url} indisponible après {tentatives} tentatives : {e}") from e
+            await asyncio.sleep(min(30, 2 ** tentative) * random.uniform(0.5, 1.5))
+
+
+async def recuperer_async(limit, base_url, timeout=TIMEOUT, page=PAGE, concurrence=CONCURRENCE):
+    """Les `limit` observations les plus récentes, par pages demandées en parallèle.
+
+    Les pages sont demandées par vagues de `concurrence` ; une page incomplète
+    marque la fin des données. Si l'API ignore `offset` (pages qui
+    n'avancent plus dans le temps), tout est redemandé en une seule requête
+    de `limit` lignes : un résultat partiel n'est jamais retourné.
+    """
+    morceaux = []
+    delai = aiohttp.ClientTimeout(total=timeout, sock_connect=min(timeout, 10))
+    async with aiohttp.ClientSession(timeout=delai) as session:
+        offset = 0
+        plus_ancien = None
+        sans_offset = False
+        while offset < limit:
+            offsets = range(offset, min(limit, offset + page * concurrence), page)
+            resultats = await asyncio.gather(*[_page(session, base_url, min(page, limit - o), o) for o in offsets])
+            fin = False
+            for o, (df, n) in zip(offsets, resultats):
+                if df.empty:
+                    fin = True
+                    break
+                if plus_ancien is not None and df.index.min() >= plus_ancien:
+                    sans_offset = fin = True
+                    break
+                plus_ancien = df.index.min()
+                morceaux.append(df)
+                if n < min(page, limit - o):
+                    fin = True
+                    break
+            if fin:
+                break
+            offset = offsets[-1] + page
+        if sans_offset:
+            df, _ = await _page(session, base_url, limit, 0)
+            morceaux = [df]
+    return normaliser(pd.concat(morceaux)) if morceaux else vide()
+
+
+def recuperer(limit, base_url, timeout=TIMEOUT, page=PAGE, concurrence=CONCURRENCE):
+    """Version synchrone de `recuperer_async`, pour le thread de rafraîchissement."""
+    return asyncio.run(recuperer_async(limit, base_url, timeout, page, concurrence))
@@ -0,0 +1,251 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import pandas as pd
+
+from ingestion import DeltaIngestor
+from schema import apres_filigranes, normaliser, vide_type
+from timeindex import TimeIndex, plage_jours
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.environ.get("METEO_REFRESH_S", "60"))
+# Mémoire maximale des lectures du stockage gardées en cache (Mo)
+CACHE_MO = float(os.environ.get("METEO_CACHE_MO", "256"))
+# Lignes gardées au plus pour une vue en échec ; au-delà, les plus anciennes sont abandonnées
+MAX_ATTENTE = int(os.environ.get("METEO_MAX_ATTENTE", "1000000"))
+
+# Instantané immuable : les sessions le lisent sans copie, il n'est jamais modifié en place
+# `debut` : premier instant couvert par df, le reste de l'historique est sur disque ;
+# `index` : TimeIndex construit une fois par instantané
+Snapshot = namedtuple("Snapshot", ["df", "version", "horodatage", "debut", "index"])
+
+
+class CacheLectures:
+    """Cache LRU des lectures du stockage, borné par la mémoire occupée et non par le nombre d'entrées.
+
+    Une lecture plus grosse que le cache entier n'est pas gardée : elle en
+    chasserait toutes les autres pour un seul usage.
+    """
+
+    def __init__(self, lire, taille_max=CACHE_MO * 1024 * 1024):
+        self._lire = lire
+        self.taille_max = taille_max
+        self.taille = 0
+        self._entrees = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, *cle):
+        with self._lock:
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                return self._entrees[cle][0]
+        df = self._lire(*cle)
+        taille = int(df.memory_usage(deep=True).sum())
+        if taille > self.taille_max:
+            return df
+        with self._lock:
+            if cle not in self._entrees:
+                self._entrees[cle] = (df, taille)
+                self.taille += taille
+                while self.taille > self.taille_max:
+                    _, (_, t) = self._entrees.popitem(last=False)
+                    self.taille -= t
+        return df
+
+
+class SharedDataset:
+    """Jeu de données unique du processus, rafraîchi par un thread de fond.
+
+    Toutes les sessions lisent le même instantané ; le thread remplace la
+    référence d'un seul coup quand de nouvelles données arrivent, ce qui
+    suffit à rendre l'échange atomique pour les lecteurs.
+
+    Des vues dérivées (agrégats, alertes...) s'abonnent avec `abonner` : leur
+    méthode `update(delta)` reçoit les lignes de chaque rafraîchissement, dans
+    le thread de fond. Un delta peut recouvrir des lignes déjà transmises.
+    Une vue en erreur est notée dans `erreurs_vues` et reçoit de nouveau les
+    lignes qu'elle n'a pas traitées (au plus MAX_ATTENTE), avec le delta
+    suivant, au rafraîchissement d'après.
+    """
+
+    def __init__(self, ingestor=None, interval=REFRESH_INTERVAL):
+        self.ingestor = ingestor or DeltaIngestor(min_interval=0)
+        self.store = self.ingestor.store
+        self.interval = interval
+        self.derniere_erreur = None
+        self.vues = {}
+        # Dernière erreur de chaque vue en échec, et deltas qu'elle n'a pas encore traités
+        self.erreurs_vues = {}
+        self._en_attente = {}
+        self._snapshot = self._instantane(self.ingestor.df, 0)
+        self._lire_stockage = CacheLectures(self.store.read)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Charge un premier instantané puis lance le rafraîchissement périodique."""
+        if self._thread is not None:
+            return self
+        if self._snapshot.df.empty:
+            self.refresh_now()
+        self._thread = threading.Thread(target=self._boucle, name="meteo-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self):
+        return self._snapshot
+
+    def abonner(self, nom, vue):
+        self.vues[nom] = vue
+        return vue
+
+    def bounds(self):
+        """Premier et dernier jour disponibles (mémoire et disque confondus)."""
+        debut, fin = self.store.bounds()
+        df = self._snapshot.df
+        if debut is None and not df.empty:
+            debut, fin = df.index.min().date(), df.index.max().date()
+        return debut, fin
+
+    def stations(self):
+        """Stations connues (mémoire et disque confondus), sans lire aucune observation."""
+        return sorted(set(self._snapshot.index.stations) | set(self.store.stations()))
+
+    def decouper(self, start, end):
+        """Sépare les jours [start, end] en une partie sur disque et une partie en mémoire.
+
+        Chaque partie est un couple (premier jour, dernier jour), ou None. Les
+        jours avant `snapshot.debut` ne changent plus avec les rafraîchissements :
+        leurs résultats peuvent être mis en cache sans la version.
+        """
+        return self._decouper(self._snapshot, start, end)
+
+    @staticmethod
+    def _decouper(snapshot, start, end):
+        start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+        if snapshot.debut is None:
+            return (start, end), None
+        premier = snapshot.debut.date()
+        if start >= premier:
+            return None, (start, end)
+        dernier_disque = premier - pd.Timedelta(days=1)
+        if end <= dernier_disque:
+            return (start, end), None
+        return (start, dernier_disque), (premier, end)
+
+    def query(self, start, end, stations=None, columns=None):
+        """Observations des jours [start, end].
+
+        Les jours couverts par l'instantané en mémoire en sont découpés, les
+        précédents sont lus dans le stockage Parquet (lectures mises en cache,
+        sans la version : ces jours ne changent plus).
+        """
+        snapshot = self._snapshot
+        disque, memoire = self._decouper(snapshot, start, end)
+        morceaux = []
+        if disque:
+            morceaux.append(self._lire_stockage(*disque,
+                                                tuple(stations) if stations is not None else None,
+                                                tuple(columns) if columns is not None else None))
+        if memoire:
+            morceaux.append(snapshot.index.slice(*plage_jours(*memoire), stations, columns))
+        pleins = [m for m in morceaux if not m.empty]
+        if not pleins:
+            # Aucune partition ni ligne en mémoire : tableau vide, mais aux colonnes attendues
+            return vide_type(columns)
+        return pleins[0] if len(pleins) == 1 else normaliser(pd.concat(pleins))
+
+    def derniers(self, start, end):
+        """Dernière observation de chaque station sur les jours [start, end]."""
+        snapshot = self._snapshot
+        disque, memoire = self._decouper(snapshot, start, end)
+        recents = snapshot.index.latest(*plage_jours(*memoire)) if memoire else None
+        if recents is None or recents.empty:
+            recents = vide_type()
+        if not disque:
+            return recents
+        # Stations sans observation en mémoire sur la plage : dernière partition sur disque
+        presentes = set(recents["Station"].astype(str)) if not recents.empty else set()
+        morceaux = []
+        for station in self.store.stations():
+            partitions = [] if station in presentes else self.store.partitions(*disque, stations=[station])
+            if partitions:
+                jour = pd.Timestamp(partitions[-1][1]).date()
+                morceaux.append(self.store.read(jour, jour, stations=[station]).iloc[-1:])
+        if not morceaux:
+            return recents
+        return normaliser(pd.concat(morceaux + [recents] if not recents.empty else morceaux))
+
+    def iter_jours(self, start, end, stations=None, columns=None):
+        """Parcourt la plage jour par jour, sans jamais charger plus d'une journée à la fois."""
+        snapshot = self._snapshot
+        for jour in pd.date_range(start, end, freq="D"):
+            if snapshot.debut is not None and jour >= snapshot.debut:
+                bloc = snapshot.index.slice(jour, jour + pd.Timedelta(days=1), stations, columns)
+            else:
+                # Lecture directe : ne pas remplir le cache des requêtes interactives
+                bloc = self.store.read(jour.date(), jour.date(), stations, columns)
+            if not bloc.empty:
+                yield bloc
+
+    def refresh_now(self):
+        try:
+            df = self.ingestor.refresh(force=True)
+        except Exception as e:
+            # On garde le dernier instantané valide si l'API est indisponible
+            self.derniere_erreur = e
+            return self._snapshot
+        self.derniere_erreur = None
+        if df is not self._snapshot.df:
+            self._snapshot = self._instantane(df, self._snapshot.version + 1)
+            self._notifier(self.ingestor.dernier_delta)
+        return self._snapshot
+
+    def _notifier(self, delta):
+        # Dictionnaire remplacé d'un seul coup : les sessions le lisent sans verrou
+        erreurs = dict(self.erreurs_vues)
+        for nom, vue in self.vues.items():
+            delta_vue = delta
+            attente = self._en_attente.get(nom)
+            if attente is not None and not attente.empty:
+                delta_vue = attente if delta.empty else normaliser(pd.concat([attente, delta]))
+            try:
+                vue.update(delta_vue)
+            except Exception as e:
+                # Une vue en erreur ne doit pas bloquer le rafraîchissement des autres ;
+                # les filigranes des vues écartent les lignes déjà traitées lors de la reprise
+                logger.exception("Mise à jour de la vue %s impossible", nom)
+                erreurs[nom] = e
+                self._en_attente[nom] = self._reste(nom, vue, delta_vue)
+            else:
+                erreurs.pop(nom, None)
+                self._en_attente.pop(nom, None)
+        self.erreurs_vues = erreurs
+
+    @staticmethod
+    def _reste(nom, vue, delta):
+        """Lignes que la vue en échec n'a pas encore prises en compte, bornées à MAX_ATTENTE."""
+        if hasattr(vue, "filigranes") and not delta.empty:
+            delta = apres_filigranes(delta, vue.filigranes)
+        if len(delta) > MAX_ATTENTE:
+            logger.warning("Vue %s en échec : %d lignes en attente abandonnées", nom, len(delta) - MAX_ATTENTE)
+            delta = delta.iloc[-MAX_ATTENTE:]
+        return delta
+
+    def _instantane(self, df, version):
+        # L'index est construit dans le thread de rafraîchissement, jamais par une session
+        return Snapshot(df, version, time.time(), self.ingestor.debut, TimeIndex(df))
+
+    def _boucle(self):
+        while not self._stop.wait(self.interval):
+            self.refresh_now()
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+DB_PATH = os.environ.get("METEO_DB", "demandes.db")
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialisee = set()
+
+
+def connexion(chemin=DB_PATH):
+    """Connexion propre au thread courant (une session Streamlit = un thread).
+
+    Mode WAL : les lectures ne bloquent plus pendant une écriture, et
+    busy_timeout fait attendre les écrivains concurrents au lieu d'échouer
+    avec "database is locked".
+    """
+    connexions = getattr(_local, "connexions", None)
+    if connexions is None:
+        connexions = _local.connexions = {}
+    conn = connexions.get(chemin)
+    if conn is None:
+        conn = sqlite3.connect(chemin, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connexions[chemin] = conn
+        with _init_lock:
+            if chemin not in _initialisee:
+                initialiser(conn)
+                _initialisee.add(chemin)
+    return conn
+
+
+def initialiser(conn):
+    with conn:
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS demandes (
+            id TEXT PRIMARY KEY,
+            nom TEXT,
+            structure TEXT,
+            email TEXT,
+            raison TEXT,
+            statut TEXT,
+            token TEXT,
+            timestamp REAL
+        )
+        ''')
+        # Paramètres de l'export demandé (JSON), ajoutés aux bases existantes
+        if "export" not in [col[1] for col in conn.execute("PRAGMA table_info(demandes)")]:
+            conn.execute("ALTER TABLE demandes ADD COLUMN export TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_demandes_email_statut ON demandes(email, statut)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_demandes_statut ON demandes(statut, timestamp)")
+
+
+def creer_demande(nom, structure, email, raison, export):
+    demande_id = str(uuid.uuid4())
+    conn = connexion()
+    with conn:
+        conn.execute('''
+            INSERT INTO demandes (id, nom, structure, email, raison, statut, token, timestamp, export)
+            VALUES (?, ?, ?, ?, ?, 'en attente', NULL, NULL, ?)
+        ''', (demande_id, nom, structure, email, raison, export))
+    return demande_id
+
+
+def token_accepte(email):
+    """Jeton de la dernière demande acceptée pour cet email, ou None."""
+    row = connexion().execute(
+        "SELECT token FROM demandes WHERE email = ? AND statut = 'acceptée' ORDER BY timestamp DESC LIMIT 1",
+        (email,)).fetchone()
+    return row[0] if row else None
+
+
+def expirer(email):
+    conn = connexion()
+    with conn:
+        conn.execute("UPDATE demandes SET statut = 'expirée' WHERE email = ? AND statut = 'acceptée'", (email,))
+
+
+def a_expire(email):
+    return connexion().execute(
+        "SELECT 1 FROM demandes WHERE email = ? AND statut = 'expirée' LIMIT 1", (email,)).fetchone() is not None
+
+
+def demandes_en_attente():
+    return connexion().execute(
+        "SELECT id, nom, structure, email, raison, export FROM demandes WHERE statut = 'en attente'").fetchall()
+
+
+def accepter(ids):
+    """Accepte plusieurs demandes en une transaction ; retourne {id: jeton}."""
+    tokens = {demande_id: str(uuid.uuid4()) for demande_id in ids}
+    maintenant = time.time()
+    conn = connexion()
+    with conn:
+        conn.executemany("UPDATE demandes SET statut='acceptée', token=?, timestamp=? WHERE id=?",
+                         [(token, maintenant, demande_id) for demande_id, token in tokens.items()])
+    return tokens
+
+
+def refuser(ids):
+    maintenant = time.time()
+    conn = connexion()
+    with conn:
+        conn.executemany("UPDATE demandes SET statut='refusée', timestamp=? WHERE id=?",
+                         [(maintenant, demande_id) for demande_id in ids])
+
+
+def historique(page=0, taille=20):
+    """Décisions (acceptées ou refusées), les plus récentes d'abord ; retourne (lignes, total)."""
+    conn = connexion()
+    total = conn.execute("SELECT COUNT(*) FROM demandes WHERE statut IN ('acceptée', 'refusée')").fetchone()[0]
+    lignes = conn.execute(
+        "SELECT nom, structure, email, raison, statut, timestamp FROM demandes "
+        "WHERE statut IN ('acceptée', 'refusée') ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+        (taille, page * taille)).fetchall()
+    return lignes, total
+
+
+def toutes_les_demandes():
+    return connexion().execute(
+        "SELECT nom, email, structure, raison, statut, timestamp FROM demandes").fetchall()
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Largeur de référence des graphiques (px) et méthode de réduction par défaut
+LARGEUR_GRAPHIQUE = int(os.environ.get("METEO_LARGEUR_GRAPHIQUE", "1200"))
+METHODE = os.environ.get("METEO_DOWNSAMPLE", "minmax")
+
+
+def budget_points(largeur=LARGEUR_GRAPHIQUE, points_par_pixel=2):
+    """Nombre de points utile pour un tracé de `largeur` pixels."""
+    return int(largeur * points_par_pixel)
+
+
+def _indices_minmax(y, n):
+    # Découpe en n/2 paquets et garde le minimum et le maximum de chacun :
+    # les pics de marée et de surcote ne peuvent pas disparaître
+    m = len(y)
+    if m <= n:
+        return np.arange(m)
+    nb = max(n // 2, 1)
+    k = -(-m // nb)
+    paquets = np.concatenate([y, np.full(nb * k - m, np.nan)]).reshape(nb, k)
+    bas = np.argmin(np.where(np.isnan(paquets), np.inf, paquets), axis=1)
+    haut = np.argmax(np.where(np.isnan(paquets), -np.inf, paquets), axis=1)
+    base = np.arange(nb) * k
+    indices = np.concatenate([base + bas, base + haut])
+    return np.unique(indices[indices < m])
+
+
+def _indices_lttb(x, y, n):
+    # Largest-Triangle-Three-Buckets : un point par paquet, celui qui forme le
+    # plus grand triangle avec le point retenu précédent et la moyenne du suivant
+    m = len(y)
+    if m <= n or n < 3:
+        return np.arange(m)
+    bornes = np.linspace(1, m - 1, n - 1).astype(np.intp)
+    indices = np.empty(n, dtype=np.intp)
+    indices[0], indices[-1] = 0, m - 1
+    a = 0
+    for i in range(n - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        suivant = slice(bornes[i + 1], bornes[i + 2]) if i + 2 < len(bornes) else slice(m - 1, m)
+        cx, cy = x[suivant].mean(), y[suivant].mean()
+        aire = np.abs((x[a] - cx) * (y[debut:fin] - y[a]) - (x[a] - x[debut:fin]) * (cy - y[a]))
+        a = debut + int(np.argmax(aire))
+        indices[i + 1] = a
+    return indices
+
+
+def reduire(df, col, n=None, methode=METHODE):
+    """Réduit une série (index DateTime trié, sans NaN sur `col`) à environ `n` points."""
+    n = n or budget_points()
+    if len(df) <= n:
+        return df
+    y = df[col].to_numpy(dtype="float64")
+    if methode == "lttb":
+        indices = _indices_lttb(df.index.asi8.astype("float64"), y, n)
+    else:
+        indices = _indices_minmax(y, n)
+    return df.iloc[indices]
+
+
+def reduire_par_station(df, col, n=None, methode=METHODE):
+    """Applique `reduire` à chaque station (une trace par station sur le graphique)."""
+    if len(df) <= (n or budget_points()):
+        return df
+    morceaux = [reduire(groupe, col, n, methode) for _, groupe in df.groupby("Station", observed=True)]
+    return pd.concat(morceaux) if morceaux else df
@@ -0,0 +1,88 @@
+import gzip
+import os
+import tempfile
+
+import pandas as pd
+
+EXPORT_COLS = ["Station", "Latitude", "Longitude", "DateTime", "TIDE HEIGHT", "WIND SPEED", "WIND DIR",
+               "AIR PRESSURE", "AIR TEMPERATURE", "DEWPOINT", "HUMIDITY", "QC"]
+
+# Format -> (extension, type MIME)
+FORMATS = {
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _preparer(bloc, colonnes):
+    bloc = bloc.reset_index()
+    if colonnes is not None:
+        bloc = bloc[[c for c in colonnes if c in bloc.columns]]
+    # Station en texte : même schéma Parquet quel que soit le bloc
+    return bloc.assign(Station=bloc["Station"].astype(str))
+
+
+def ecrire_csv_gz(blocs, chemin, colonnes=EXPORT_COLS):
+    # Niveau 6 : ~3x plus rapide que le niveau 9 par défaut, pour un fichier à peine plus gros
+    with gzip.open(chemin, "wt", compresslevel=6, encoding="utf-8", newline="") as f:
+        entete = True
+        for bloc in blocs:
+            _preparer(bloc, colonnes).to_csv(f, header=entete, index=False)
+            entete = False
+        if entete:
+            f.write(",".join(colonnes or []) + "\n")
+
+
+def ecrire_parquet(blocs, chemin, colonnes=EXPORT_COLS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for bloc in blocs:
+            table = pa.Table.from_pandas(_preparer(bloc, colonnes), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(chemin, table.schema)
+            writer.write_table(table.cast(writer.schema))
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=colonnes or [])), chemin)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def exporter(blocs, format="csv.gz", colonnes=EXPORT_COLS, dossier=None):
+    """Écrit les blocs un par un dans un fichier temporaire et retourne son chemin.
+
+    La mémoire utilisée reste celle d'un bloc, quelle que soit la taille de
+    l'historique exporté.
+    """
+    extension, _ = FORMATS[format]
+    fd, chemin = tempfile.mkstemp(prefix="MeteoMarinePAD_", suffix=extension, dir=dossier)
+    os.close(fd)
+    try:
+        if format == "parquet":
+            ecrire_parquet(blocs, chemin, colonnes)
+        else:
+            ecrire_csv_gz(blocs, chemin, colonnes)
+    except Exception:
+        os.remove(chemin)
+        raise
+    return chemin
+
+
+def construire(dataset, rollups, params, dossier=None):
+    """Construit l'export décrit par `params` (plage, stations, résolution, format)."""
+    debut = pd.Timestamp(params["debut"]).date()
+    fin = pd.Timestamp(params["fin"]).date()
+    stations = params.get("stations") or None
+    if params.get("resolution", "Brute") == "Brute":
+        blocs = dataset.iter_jours(debut, fin, stations=stations)
+        colonnes = EXPORT_COLS
+    else:
+        frequence = "heure" if params["resolution"] == "Horaire" else "jour"
+        blocs = [rollups.table(frequence, pd.Timestamp(debut), pd.Timestamp(fin) + pd.Timedelta(days=1),
+                               stations=stations)]
+        colonnes = None
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    return exporter(blocs, params.get("format", "csv.gz"), colonnes, dossier)
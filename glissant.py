@@ -0,0 +1,177 @@
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from qc import nettoyer
+from schema import apres_filigranes, avancer_filigranes
+
+PARAMS_SUIVIS = ["AIR PRESSURE", "WIND SPEED", "AIR TEMPERATURE", "HUMIDITY", "TIDE HEIGHT", "SURGE"]
+FENETRES = ["10min", "1h", "24h"]
+# Écart (en écarts-types) à partir duquel une valeur est signalée
+SEUIL_Z = 3.0
+COLONNES_STATS = ["Station", "Paramètre", "Fenêtre", "n", "moyenne", "écart-type", "min", "max", "z"]
+
+
+class Fenetre:
+    """Moyenne, variance, min et max d'une série sur la fenêtre glissante (t - duree, t].
+
+    Sommes courantes (décalées de la première valeur, pour limiter les
+    erreurs d'arrondi de la variance) et files monotones pour le min et le
+    max : chaque observation coûte O(1) en moyenne.
+    """
+
+    __slots__ = ("duree", "valeurs", "somme", "somme2", "ref", "mins", "maxs", "z")
+
+    def __init__(self, duree):
+        self.duree = duree
+        self.valeurs = deque()
+        self.somme = 0.0
+        self.somme2 = 0.0
+        self.ref = None
+        self.mins = deque()
+        self.maxs = deque()
+        # Écart de la dernière valeur à la fenêtre qui la précède
+        self.z = np.nan
+
+    def ajouter(self, t, x):
+        self._expirer(t)
+        self.z = self.zscore(x)
+        if self.ref is None:
+            self.ref = x
+        d = x - self.ref
+        self.valeurs.append((t, d))
+        self.somme += d
+        self.somme2 += d * d
+        while self.mins and self.mins[-1][1] >= x:
+            self.mins.pop()
+        self.mins.append((t, x))
+        while self.maxs and self.maxs[-1][1] <= x:
+            self.maxs.pop()
+        self.maxs.append((t, x))
+
+    def _expirer(self, t):
+        limite = t - self.duree
+        valeurs = self.valeurs
+        while valeurs and valeurs[0][0] <= limite:
+            _, d = valeurs.popleft()
+            self.somme -= d
+            self.somme2 -= d * d
+        while self.mins and self.mins[0][0] <= limite:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] <= limite:
+            self.maxs.popleft()
+
+    @property
+    def n(self):
+        return len(self.valeurs)
+
+    @property
+    def moyenne(self):
+        return self.ref + self.somme / self.n if self.n else np.nan
+
+    @property
+    def variance(self):
+        n = self.n
+        if n < 2:
+            return np.nan
+        return max(0.0, (self.somme2 - self.somme * self.somme / n) / (n - 1))
+
+    @property
+    def min(self):
+        return self.mins[0][1] if self.mins else np.nan
+
+    @property
+    def max(self):
+        return self.maxs[0][1] if self.maxs else np.nan
+
+    def zscore(self, x):
+        ecart = np.sqrt(self.variance)
+        if not ecart > 0:
+            return np.nan
+        return (x - self.moyenne) / ecart
+
+
+def libelle(param, fenetre, z):
+    return f"{'📈' if z > 0 else '📉'} {param} {z:+.1f}σ ({fenetre})"
+
+
+class StatsGlissantes:
+    """Statistiques glissantes par station, paramètre et fenêtre, mises à jour au fil de l'eau.
+
+    Chaque nouvelle observation met à jour ses fenêtres en O(1) ; les
+    valeurs marquées par le contrôle qualité sont ignorées. `ecarts` donne,
+    pour la dernière observation de chaque station, les paramètres qui
+    s'écartent de plus de `seuil` écarts-types d'une de leurs fenêtres.
+    """
+
+    def __init__(self, params=PARAMS_SUIVIS, fenetres=FENETRES, seuil=SEUIL_Z):
+        self.params = params
+        self.fenetres = fenetres
+        self.seuil = seuil
+        self.filigranes = {}
+        self.ecarts = {}
+        # Libellés des écarts, formatés une fois par mise à jour : {station: [libellé, ...]}
+        self.badges = {}
+        self._durees = {f: pd.Timedelta(f).value for f in fenetres}
+        self._etat = {}
+        self._lock = threading.Lock()
+
+    def update(self, delta):
+        # Stockage vide au premier démarrage : tableau sans colonnes
+        if delta.empty:
+            return
+        with self._lock:
+            nouveau = apres_filigranes(delta, self.filigranes)
+            if nouveau.empty:
+                return
+            # Au-delà de la plus longue fenêtre, les lignes seraient aussitôt expirées
+            nouveau = nouveau.loc[nouveau.index.max() - pd.Timedelta(max(self._durees.values())):]
+            params = [p for p in self.params if p in nouveau.columns]
+            donnees = nettoyer(nouveau, params)
+            # Horodatages en entiers (ns), quelle que soit la résolution de l'index
+            temps = donnees.index.values.astype("datetime64[ns]").view("int64")
+            ecarts = dict(self.ecarts)
+            for station, positions in donnees.groupby("Station", observed=True).indices.items():
+                t = temps[positions]
+                for param in params:
+                    x = donnees[param].to_numpy(dtype="float64")[positions]
+                    fenetres = [self._fenetre(station, param, f) for f in self.fenetres]
+                    for ti, xi in zip(t.tolist(), x.tolist()):
+                        if xi != xi:
+                            continue
+                        for fenetre in fenetres:
+                            fenetre.ajouter(ti, xi)
+                ecarts[station] = self._ecarts(station, t[-1])
+            avancer_filigranes(nouveau, self.filigranes)
+            self.ecarts = ecarts
+            self.badges = {station: [libelle(*ecart) for ecart in liste] for station, liste in ecarts.items()}
+
+    def _fenetre(self, station, param, nom):
+        cle = (station, param, nom)
+        fenetre = self._etat.get(cle)
+        if fenetre is None:
+            fenetre = self._etat[cle] = Fenetre(self._durees[nom])
+        return fenetre
+
+    def _ecarts(self, station, dernier):
+        # Seules les fenêtres dont la dernière valeur est l'observation la plus récente comptent
+        resultat = []
+        for param in self.params:
+            candidats = []
+            for nom in self.fenetres:
+                f = self._etat.get((station, param, nom))
+                if f is not None and f.valeurs and f.valeurs[-1][0] == dernier and abs(f.z) >= self.seuil:
+                    candidats.append((abs(f.z), nom, f.z))
+            if candidats:
+                _, nom, z = max(candidats)
+                resultat.append((param, nom, z))
+        return resultat
+
+    def statistiques(self, station=None):
+        """Tableau des statistiques courantes (une ligne par station, paramètre et fenêtre)."""
+        with self._lock:
+            lignes = [(s, p, nom, f.n, f.moyenne, np.sqrt(f.variance), f.min, f.max, f.z)
+                      for (s, p, nom), f in self._etat.items() if station is None or s == station]
+        return pd.DataFrame(lignes, columns=COLONNES_STATS)
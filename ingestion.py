@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from client import TIMEOUT, recuperer
+from qc import controler
+from schema import apres_filigranes, avancer_filigranes, dedoublonner, normaliser, vide
+from storage import PartitionedStore
+
+# Adresse de l'API (surchargée par METEO_API_URL, par ex. pour mock_api.py)
+API_BASE = os.environ.get("METEO_API_URL", "https://data-real-time-2.onrender.com")
+# Nombre de jours gardés en mémoire ; l'historique complet reste sur disque
+HOT_DAYS = int(os.environ.get("METEO_HOT_DAYS", "30"))
+# Retard au-delà duquel une station est considérée silencieuse : les pages ne remontent
+# pas jusqu'à son filigrane (ses nouvelles lignes sont gardées si elles y figurent)
+RETARD_MAX = pd.Timedelta(os.environ.get("METEO_RETARD_MAX", "1D"))
+
+
+def fetch_donnees(limit, base_url=API_BASE, timeout=TIMEOUT):
+    """Récupère les `limit` observations les plus récentes de l'endpoint /donnees.
+
+    Pages parallèles, délais et nouvelles tentatives : voir client.recuperer.
+    """
+    return recuperer(limit, base_url, timeout)
+
+
+class DeltaIngestor:
+    """Copie locale des observations, complétée par deltas.
+
+    Le premier chargement récupère tout l'historique, ou relit les derniers
+    jours depuis le stockage Parquet. Ensuite, seules les pages les plus
+    récentes sont demandées : la taille de page double jusqu'à recouvrir la
+    dernière date connue de chaque station, puis les nouvelles lignes sont
+    écrites dans le stockage et fusionnées sans doublons dans la fenêtre
+    gardée en mémoire.
+    """
+
+    def __init__(self, base_url=API_BASE, store=None, hot_days=HOT_DAYS, page_size=500,
+                 max_pages=8, full_limit=50000000000, min_interval=30.0, fetch=fetch_donnees):
+        self.base_url = base_url
+        self.store = store if store is not None else PartitionedStore()
+        self.hot_days = hot_days
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.full_limit = full_limit
+        self.min_interval = min_interval
+        self.fetch = fetch
+        self._lock = threading.Lock()
+        self._dernier_appel = None
+        # Lignes reçues au dernier rafraîchissement (peut recouvrir des lignes déjà connues)
+        self.dernier_delta = vide()
+        # Début de la période couverte par self.df (minuit)
+        self.debut = None
+        self.df = self._lire_stockage()
+
+    @property
+    def last_datetime(self):
+        if self.df.empty:
+            return self.store.last_datetime()
+        return self.df.index.max()
+
+    def refresh(self, force=False):
+        """Complète la copie locale et la retourne.
+
+        Les appels rapprochés de moins de `min_interval` secondes réutilisent
+        la copie existante sans interroger l'API.
+        """
+        with self._lock:
+            maintenant = time.monotonic()
+            if (not force and self._dernier_appel is not None
+                    and maintenant - self._dernier_appel < self.min_interval):
+                return self.df
+            self._dernier_appel = maintenant
+
+            last = self.last_datetime
+            if last is None:
+                nouveau = self.fetch(self.full_limit, self.base_url)
+            else:
+                nouveau = self._fetch_delta(last)
+
+            # Contrôle qualité une fois par lot, avant stockage : doublons retirés, colonne QC
+            nouveau = controler(nouveau, self.df)
+            self.dernier_delta = nouveau
+            if not nouveau.empty:
+                self.store.write(nouveau)
+                self._fusionner(nouveau)
+            return self.df
+
+    def _fetch_delta(self, last):
+        filigranes = avancer_filigranes(self.df, {}) if not self.df.empty else {}
+        # Une station plus lente peut encore envoyer des lignes antérieures à `last` :
+        # la page doit remonter jusqu'au plus ancien filigrane des stations actives
+        cible = min([t for t in filigranes.values() if t >= last - RETARD_MAX], default=last)
+        limit = self.page_size
+        for _ in range(self.max_pages):
+            page = self.fetch(limit, self.base_url)
+            # Page incomplète ou recouvrant le filigrane de chaque station : le delta est complet
+            if page.empty or len(page) < limit or page.index.min() <= cible:
+                break
+            limit *= 2
+        else:
+            # Trop de retard accumulé : on recharge tout l'historique
+            page = self.fetch(self.full_limit, self.base_url)
+        if page.empty:
+            return page
+        # Filigrane par station : une ligne tardive d'une station lente n'est pas écartée
+        # parce qu'une autre station a déjà envoyé un horodatage plus récent
+        return apres_filigranes(page, filigranes)
+
+    def _fusionner(self, nouveau):
+        df = dedoublonner(normaliser(pd.concat([self.df, nouveau])))
+        self.debut = self._debut_fenetre(df.index.max())
+        self.df = df.loc[self.debut:]
+
+    def _debut_fenetre(self, dernier):
+        # La fenêtre commence à minuit pour couvrir des journées entières
+        return (dernier - pd.Timedelta(days=self.hot_days)).normalize()
+
+    def _lire_stockage(self):
+        dernier = self.store.last_datetime()
+        if dernier is None:
+            return vide()
+        self.debut = self._debut_fenetre(dernier)
+        return self.store.read(start=self.debut.date())
@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Durée de validité d'un lien de téléchargement, à partir de la fin de la construction
+DUREE_LIEN = int(os.environ.get("METEO_DUREE_LIEN", "60"))
+EXPORT_DIR = os.path.join("data", "exports")
+
+
+class Job:
+    def __init__(self, token, format_fichier=None):
+        self.token = token
+        # Clé de export.FORMATS, pour l'extension et le type MIME du téléchargement
+        self.format = format_fichier
+        self.statut = "en cours"
+        self.chemin = None
+        self.erreur = None
+        self.fin = None
+
+    def restant(self, ttl):
+        """Secondes de validité restantes (None tant que le fichier n'est pas prêt)."""
+        if self.fin is None:
+            return None
+        return max(0.0, self.fin + ttl - time.time())
+
+
+class ExportJobs:
+    """File de construction des exports, indexée par le jeton d'approbation.
+
+    L'acceptation d'une demande soumet un job au pool ; le demandeur retrouve
+    ensuite son fichier par simple recherche sur le jeton. Les fichiers sont
+    supprimés `ttl` secondes après la fin de leur construction.
+    """
+
+    def __init__(self, max_workers=2, ttl=DUREE_LIEN):
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="meteo-export")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def soumettre(self, token, fonction, *args, format_fichier=None):
+        """Lance `fonction(*args)` en arrière-plan ; elle doit retourner le chemin du fichier."""
+        job = Job(token, format_fichier)
+        with self._lock:
+            self._jobs[token] = job
+        self._pool.submit(self._executer, job, fonction, args)
+        return job
+
+    def get(self, token):
+        self.purger()
+        with self._lock:
+            return self._jobs.get(token)
+
+    def purger(self):
+        with self._lock:
+            expires = [job for job in self._jobs.values() if job.fin is not None and job.restant(self.ttl) <= 0]
+            for job in expires:
+                del self._jobs[job.token]
+        for job in expires:
+            if job.chemin and os.path.exists(job.chemin):
+                os.remove(job.chemin)
+
+    @staticmethod
+    def _executer(job, fonction, args):
+        try:
+            job.chemin = fonction(*args)
+            job.statut = "prêt"
+        except Exception as e:
+            job.erreur = e
+            job.statut = "erreur"
+        job.fin = time.time()
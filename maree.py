@@ -0,0 +1,178 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from qc import valide
+from schema import apres_filigranes, avancer_filigranes
+
+# Principales composantes harmoniques, par ordre d'importance : vitesse angulaire en degrés par heure
+CONSTITUANTS = {
+    "M2": 28.9841042,
+    "S2": 30.0000000,
+    "K1": 15.0410686,
+    "O1": 13.9430356,
+    "N2": 28.4397295,
+    "K2": 30.0821373,
+    "P1": 14.9589314,
+    "Q1": 13.3986609,
+    "M4": 57.9682084,
+    "MS4": 58.9841042,
+    "M6": 86.9523127,
+}
+# Origine des phases ; les phases ne sont pas rapportées aux arguments astronomiques
+ORIGINE = np.datetime64("2000-01-01T00:00:00", "ns")
+# Lignes par produit matriciel (borne la mémoire de la matrice des régresseurs)
+TAILLE_BLOC = 500_000
+
+
+def heures(temps):
+    return (np.asarray(temps, dtype="datetime64[ns]") - ORIGINE) / np.timedelta64(1, "h")
+
+
+def matrice(temps, vitesses):
+    """Régresseurs [1, cos(ω₁t), sin(ω₁t), cos(ω₂t), ...] pour des horodatages."""
+    phases = np.multiply.outer(heures(temps), np.deg2rad(vitesses))
+    X = np.empty((len(phases), 1 + 2 * len(vitesses)))
+    X[:, 0] = 1.0
+    X[:, 1::2] = np.cos(phases)
+    X[:, 2::2] = np.sin(phases)
+    return X
+
+
+def resolus(vitesses, duree):
+    """Composantes séparables sur `duree` heures (critère de Rayleigh), dans l'ordre donné."""
+    gardes = []
+    for i, v in enumerate(vitesses):
+        if v * duree < 360:
+            continue
+        if all(abs(v - vitesses[j]) * duree >= 360 for j in gardes):
+            gardes.append(i)
+    return gardes
+
+
+class AnalyseMaree:
+    """Analyse harmonique de la hauteur de marée, par station, par moindres carrés.
+
+    Seules les équations normales (XᵀX, Xᵀy) sont gardées : chaque delta y
+    ajoute ses lignes en quelques produits matriciels, sans relire
+    l'historique. Les coefficients sont résolus à la demande et mis en cache
+    jusqu'au prochain delta. Les composantes que la durée d'observation ne
+    permet pas de séparer (par ex. K2 de S2 avant six mois) sont écartées.
+    Pas de corrections nodales : sur plusieurs années, l'amplitude de
+    certaines composantes varie de quelques pourcents.
+    """
+
+    def __init__(self, constituants=None, param="TIDE HEIGHT"):
+        self.constituants = list(constituants or CONSTITUANTS)
+        self.vitesses = np.array([CONSTITUANTS[c] for c in self.constituants])
+        self.param = param
+        self.filigranes = {}
+        # station -> [XᵀX, Xᵀy, nombre de lignes, premier horodatage, dernier horodatage]
+        self._normales = {}
+        self._coefficients = {}
+        self._lock = threading.Lock()
+
+    def charger(self, store):
+        """Reprend les équations normales enregistrées, puis y ajoute l'historique stocké plus récent.
+
+        Comme pour rollups.Rollups, seules les partitions à partir du
+        filigrane de chaque station sont relues, puis l'état est enregistré.
+        """
+        etat = store.load_state("maree")
+        if etat is not None and (etat["constituants"], etat["param"]) == (self.constituants, self.param):
+            self.filigranes, self._normales = etat["filigranes"], etat["normales"]
+        for station in store.stations():
+            filigrane = self.filigranes.get(station)
+            debut = filigrane.date() if filigrane is not None else None
+            self.update(store.read(start=debut, stations=[station], columns=[self.param, "QC"]))
+        with self._lock:
+            store.save_state("maree", {"constituants": self.constituants, "param": self.param,
+                                       "filigranes": self.filigranes, "normales": self._normales})
+        return self
+
+    def update(self, delta):
+        if delta.empty or self.param not in delta.columns:
+            return
+        delta = apres_filigranes(delta, self.filigranes)
+        if delta.empty:
+            return
+        temps = delta.index.values
+        y = delta[self.param].to_numpy(dtype="float64")
+        # Hauteurs marquées par le contrôle qualité écartées
+        valides = valide(delta, self.param)
+        k = 1 + 2 * len(self.vitesses)
+
+        with self._lock:
+            for station, positions in delta.groupby("Station", observed=True).indices.items():
+                positions = positions[valides[positions]]
+                if not len(positions):
+                    continue
+                acc = self._normales.setdefault(station, [np.zeros((k, k)), np.zeros(k), 0, temps[positions[0]], None])
+                for debut in range(0, len(positions), TAILLE_BLOC):
+                    p = positions[debut:debut + TAILLE_BLOC]
+                    X = matrice(temps[p], self.vitesses)
+                    acc[0] += X.T @ X
+                    acc[1] += X.T @ y[p]
+                    acc[2] += len(p)
+                acc[3] = min(acc[3], temps[positions[0]])
+                acc[4] = temps[positions[-1]] if acc[4] is None else max(acc[4], temps[positions[-1]])
+                self._coefficients.pop(station, None)
+            avancer_filigranes(delta, self.filigranes)
+
+    @property
+    def stations(self):
+        return list(self._normales)
+
+    def coefficients(self, station):
+        """Vecteur [niveau moyen, a₁, b₁, a₂, b₂, ...] de la station, ou None."""
+        with self._lock:
+            if station in self._coefficients:
+                return self._coefficients[station]
+            acc = self._normales.get(station)
+            if acc is None:
+                return None
+            XtX, Xty, n, premier, dernier = acc
+            duree = (dernier - premier) / np.timedelta64(1, "h")
+            gardes = resolus(self.vitesses, duree)
+            colonnes = np.array([0] + [c for i in gardes for c in (1 + 2 * i, 2 + 2 * i)])
+            beta = None
+            if n > 2 * len(colonnes):
+                beta = np.zeros(len(Xty))
+                beta[colonnes] = np.linalg.lstsq(XtX[np.ix_(colonnes, colonnes)], Xty[colonnes], rcond=None)[0]
+            self._coefficients[station] = beta
+            return beta
+
+    def composantes(self, station):
+        """Amplitude et phase (degrés, origine ORIGINE) de chaque composante retenue."""
+        beta = self.coefficients(station)
+        if beta is None:
+            return pd.DataFrame(columns=["amplitude", "phase"])
+        a, b = beta[1::2], beta[2::2]
+        df = pd.DataFrame({"vitesse": self.vitesses, "amplitude": np.hypot(a, b),
+                           "phase": np.degrees(np.arctan2(b, a)) % 360}, index=self.constituants)
+        return df[df["amplitude"] > 0]
+
+    def predire(self, station, temps):
+        """Hauteur prédite aux horodatages `temps` (NaN si la station n'est pas analysée)."""
+        beta = self.coefficients(station)
+        temps = np.asarray(temps, dtype="datetime64[ns]")
+        if beta is None:
+            return np.full(len(temps), np.nan)
+        resultat = np.empty(len(temps))
+        for debut in range(0, len(temps), TAILLE_BLOC):
+            resultat[debut:debut + TAILLE_BLOC] = matrice(temps[debut:debut + TAILLE_BLOC], self.vitesses) @ beta
+        return resultat
+
+    def prediction(self, station, start, end, pas="10min"):
+        """Marée prédite sur [start, end) à pas régulier."""
+        temps = pd.date_range(start, end, freq=pas, inclusive="left", name="DateTime")
+        return pd.Series(self.predire(station, temps.values), index=temps, name="Marée prédite")
+
+    def residus(self, df):
+        """Marée prédite et résidu (observé - prédit, la surcote) pour les lignes de df."""
+        predite = np.full(len(df), np.nan)
+        for station, positions in df.groupby("Station", observed=True).indices.items():
+            predite[positions] = self.predire(station, df.index.values[positions])
+        return pd.DataFrame({"Station": df["Station"], "Marée prédite": predite,
+                             "Résidu": df[self.param].to_numpy(dtype="float64") - predite}, index=df.index)
@@ -0,0 +1,149 @@
+"""Serveur local imitant l'endpoint /donnees de l'API MeteoMarine.
+
+Utilisation : `python mock_api.py --port 8000`, puis lancer le tableau de bord
+avec `METEO_API_URL=http://127.0.0.1:8000`. `--pannes` et `--latence`
+simulent un démarrage à froid (premières requêtes en erreur 503, réponses
+lentes), `--tronquees` des réponses coupées en cours de route et
+`--sans-offset` une API qui ne gère que `limit`.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATIONS = {
+    "PAD-1": (4.0450, 9.6900),
+    "PAD-2": (4.0200, 9.7050),
+    "PAD-3": (3.9900, 9.6400),
+}
+
+
+def generer_observation(station, date):
+    lat, lon = STATIONS.get(station, (4.05, 9.68))
+    # L'API renvoie les mesures sous forme de texte
+    return {
+        "Station": station,
+        "Latitude": lat,
+        "Longitude": lon,
+        "DateTime": date.strftime("%Y-%m-%d %H:%M:%S"),
+        "TIDE HEIGHT": f"{random.uniform(0.2, 3.0):.2f}",
+        "WIND SPEED": f"{random.uniform(0, 12):.1f}",
+        "WIND DIR": f"{random.uniform(0, 360):.0f}",
+        "AIR PRESSURE": f"{random.uniform(1005, 1015):.1f}",
+        "AIR TEMPERATURE": f"{random.uniform(22, 33):.1f}",
+        "DEWPOINT": f"{random.uniform(20, 26):.1f}",
+        "HUMIDITY": f"{random.uniform(60, 100):.0f}",
+        "SURGE": f"{random.uniform(-0.2, 0.4):.2f}",
+    }
+
+
+class MockAPI:
+    """Jeu d'observations en mémoire, servi du plus récent au plus ancien."""
+
+    def __init__(self, debut=None, n_pas=100, pas=timedelta(minutes=1), pannes=0, latence=0.0,
+                 tronquees=0, offset=True):
+        self.pas = pas
+        self.lignes = []
+        # Requêtes reçues, y compris celles rejetées
+        self.nb_requetes = 0
+        # Nombre de requêtes restant à rejeter (503) et délai ajouté à chaque réponse
+        self.pannes = pannes
+        self.latence = latence
+        # Nombre de réponses restant à couper en cours de tableau JSON ; offset=False : paramètre ignoré
+        self.tronquees = tronquees
+        self.offset = offset
+        self._lock = threading.Lock()
+        self._prochaine = debut or datetime(2025, 1, 1)
+        self.ajouter(n_pas)
+
+    def ajouter(self, n_pas=1):
+        """Ajoute `n_pas` pas de temps d'observations pour chaque station."""
+        with self._lock:
+            for _ in range(n_pas):
+                for station in STATIONS:
+                    self.lignes.append(generer_observation(station, self._prochaine))
+                self._prochaine += self.pas
+
+    def donnees(self, limit, offset=0):
+        """Observations du plus récent au plus ancien, à partir de la `offset`-ième."""
+        if not self.offset:
+            offset = 0
+        with self._lock:
+            fin = len(self.lignes) - offset
+            if limit <= 0 or fin <= 0:
+                return []
+            return list(reversed(self.lignes[max(0, fin - limit):fin]))
+
+    def en_panne(self):
+        with self._lock:
+            self.nb_requetes += 1
+            if self.pannes > 0:
+                self.pannes -= 1
+                return True
+            return False
+
+    def a_tronquer(self):
+        with self._lock:
+            if self.tronquees > 0:
+                self.tronquees -= 1
+                return True
+            return False
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if api.latence:
+                time.sleep(api.latence)
+            if api.en_panne():
+                self.send_error(503)
+                return
+            if url.path != "/donnees":
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            limit = int(params.get("limit", ["100"])[0])
+            offset = int(params.get("offset", ["0"])[0])
+            corps = json.dumps(api.donnees(limit, offset)).encode("utf-8")
+            if api.a_tronquer():
+                # Corps complet pour HTTP (Content-Length cohérent), mais tableau JSON inachevé
+                corps = corps[:len(corps) // 2]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def demarrer(api=None, host="127.0.0.1", port=0):
+    """Démarre le serveur dans un thread ; retourne (serveur, api, url de base)."""
+    api = api or MockAPI()
+    serveur = ThreadingHTTPServer((host, port), _handler(api))
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur, api, f"http://{host}:{serveur.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pas", type=int, default=1440, help="pas de temps initiaux par station")
+    parser.add_argument("--pannes", type=int, default=0, help="premières requêtes rejetées (503)")
+    parser.add_argument("--latence", type=float, default=0.0, help="délai ajouté à chaque réponse (s)")
+    parser.add_argument("--tronquees", type=int, default=0, help="premières réponses coupées en cours de JSON")
+    parser.add_argument("--sans-offset", action="store_true", help="ignorer le paramètre offset")
+    args = parser.parse_args()
+    api = MockAPI(n_pas=args.pas, pannes=args.pannes, latence=args.latence, tronquees=args.tronquees,
+                  offset=not args.sans_offset)
+    serveur = ThreadingHTTPServer(("127.0.0.1", args.port), _handler(api))
+    print(f"API factice sur http://127.0.0.1:{args.port}/donnees")
+    serveur.serve_forever()
@@ -0,0 +1,144 @@
+import contextlib
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+
+# METEO_PROFIL=1 : durées ; METEO_PROFIL=memoire : durées et pics mémoire (tracemalloc, plus coûteux)
+PROFIL = os.environ.get("METEO_PROFIL", "")
+
+
+class _ExecutionInactive:
+    # Instrumentation désactivée : chaque appel se réduit à un appel de méthode vide
+    def etape(self, nom):
+        pass
+
+    def pause(self):
+        pass
+
+    def fin(self):
+        pass
+
+
+_INACTIVE = _ExecutionInactive()
+_NUL = contextlib.nullcontext()
+
+
+class _Execution:
+    """Chronométrage d'une exécution du script, section par section."""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.session = threading.get_ident()
+        self.debut_total = time.perf_counter()
+        self.section = None
+        self.debut = None
+
+    def etape(self, nom):
+        """Termine la section en cours et commence `nom`."""
+        self._clore()
+        self.section = nom
+        if self.profiler.memoire:
+            tracemalloc.reset_peak()
+        self.debut = time.perf_counter()
+
+    def pause(self):
+        """Termine la section en cours sans en commencer une autre."""
+        self._clore()
+
+    def fin(self):
+        self._clore()
+        self.profiler.enregistrer("total", self.debut_total, time.perf_counter() - self.debut_total, None, self.session)
+
+    def _clore(self):
+        if self.section is None:
+            return
+        duree = time.perf_counter() - self.debut
+        pic = tracemalloc.get_traced_memory()[1] if self.profiler.memoire else None
+        self.profiler.enregistrer(self.section, self.debut, duree, pic, self.session)
+        self.section = None
+
+
+class Profiler:
+    """Mesures des sections du script, agrégées sur toutes les sessions du processus.
+
+    Chaque section garde ses `taille` dernières mesures ; les centiles sont
+    calculés à la demande, dans la barre latérale admin. Les pics mémoire sont
+    globaux au processus : avec plusieurs sessions simultanées, ils sont
+    indicatifs.
+    """
+
+    def __init__(self, mode=PROFIL, taille=1000):
+        self.taille = taille
+        self._mesures = defaultdict(lambda: deque(maxlen=taille))
+        self._lock = threading.Lock()
+        self.actif = False
+        self.memoire = False
+        self.configurer(mode)
+
+    def configurer(self, mode):
+        self.actif = mode not in ("", "0", None)
+        self.memoire = mode == "memoire"
+        if self.memoire and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not self.memoire and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def execution(self):
+        return _Execution(self) if self.actif else _INACTIVE
+
+    @contextlib.contextmanager
+    def _section(self, nom):
+        if self.memoire:
+            tracemalloc.reset_peak()
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            pic = tracemalloc.get_traced_memory()[1] if self.memoire else None
+            self.enregistrer(nom, debut, time.perf_counter() - debut, pic, threading.get_ident())
+
+    def section(self, nom):
+        """Mesure un bloc indépendant (par ex. un fragment réexécuté seul)."""
+        return self._section(nom) if self.actif else _NUL
+
+    def enregistrer(self, section, debut, duree, pic, session):
+        with self._lock:
+            self._mesures[section].append((debut, duree, pic, session))
+
+    def statistiques(self):
+        """Centiles de durée (ms) et pic mémoire (Mo) par section."""
+        with self._lock:
+            mesures = {section: list(valeurs) for section, valeurs in self._mesures.items()}
+        lignes = []
+        for section, valeurs in mesures.items():
+            durees = np.array([v[1] for v in valeurs]) * 1000
+            pics = [v[2] for v in valeurs if v[2] is not None]
+            p50, p95, p99 = np.percentile(durees, [50, 95, 99])
+            lignes.append({"section": section, "n": len(durees), "p50 ms": p50, "p95 ms": p95, "p99 ms": p99,
+                           "max ms": durees.max(), "pic Mo": max(pics) / 2 ** 20 if pics else None})
+        if not lignes:
+            return pd.DataFrame(columns=["section", "n", "p50 ms", "p95 ms", "p99 ms", "max ms", "pic Mo"])
+        return pd.DataFrame(lignes).sort_values("p95 ms", ascending=False, ignore_index=True).round(2)
+
+    def trace(self):
+        """Mesures au format Chrome Trace Event (chrome://tracing, Perfetto)."""
+        with self._lock:
+            mesures = {section: list(valeurs) for section, valeurs in self._mesures.items()}
+        evenements = []
+        for section, valeurs in mesures.items():
+            for debut, duree, pic, session in valeurs:
+                evenement = {"name": section, "ph": "X", "ts": debut * 1e6, "dur": duree * 1e6,
+                             "pid": os.getpid(), "tid": session}
+                if pic is not None:
+                    evenement["args"] = {"pic_octets": pic}
+                evenements.append(evenement)
+        return {"traceEvents": sorted(evenements, key=lambda e: e["ts"])}
+
+    def vider(self):
+        with self._lock:
+            self._mesures.clear()
@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+from schema import MESURES, dedoublonner, normaliser
+
+# Défauts contrôlés par mesure ; le bit du défaut d sur la mesure m est
+# 1 << (len(DEFAUTS) * MESURES.index(m) + DEFAUTS.index(d)), dans la colonne "QC" (uint32)
+DEFAUTS = ["plage", "palier", "pic"]
+# Ligne qui suit une lacune (intervalle anormalement long depuis l'observation précédente)
+LACUNE = 1 << (len(DEFAUTS) * len(MESURES))
+
+# Valeurs physiquement plausibles ; en dessous de 0.3 m, une hauteur de marée est une lecture invalide
+PLAGES = {
+    "TIDE HEIGHT": (0.3, 6.0),
+    "WIND SPEED": (0.0, 60.0),
+    "WIND DIR": (0.0, 360.0),
+    "AIR PRESSURE": (950.0, 1060.0),
+    "AIR TEMPERATURE": (10.0, 45.0),
+    "DEWPOINT": (5.0, 35.0),
+    "HUMIDITY": (0.0, 100.0),
+    "SURGE": (-2.0, 3.0),
+}
+# Durée au-delà de laquelle une valeur constante signale un capteur bloqué
+PALIERS = {
+    "TIDE HEIGHT": "1h",
+    "AIR PRESSURE": "3h",
+    "AIR TEMPERATURE": "3h",
+    "DEWPOINT": "6h",
+    "HUMIDITY": "6h",
+    "WIND SPEED": "6h",
+}
+# Valeurs qui restent constantes sans défaut de capteur (air saturé, calme plat) : pas de palier
+BORNES_PALIER = {
+    "HUMIDITY": 100.0,
+    "WIND SPEED": 0.0,
+}
+# Écart minimal avec les deux voisins (de même signe) pour qu'une valeur isolée soit un pic
+PICS = {
+    "TIDE HEIGHT": 0.5,
+    "AIR PRESSURE": 5.0,
+    "AIR TEMPERATURE": 5.0,
+    "DEWPOINT": 5.0,
+    "HUMIDITY": 30.0,
+    "WIND SPEED": 15.0,
+    "SURGE": 0.5,
+}
+# Lacune : intervalle supérieur à FACTEUR_LACUNE fois le pas habituel (médian) de la station
+FACTEUR_LACUNE = 3
+
+
+def bit(param, defaut):
+    return 1 << (len(DEFAUTS) * MESURES.index(param) + DEFAUTS.index(defaut))
+
+
+def masque(param):
+    """Bits de tous les défauts de `param`."""
+    return sum(bit(param, defaut) for defaut in DEFAUTS)
+
+
+def valide(df, param):
+    """Lignes où `param` est renseigné et ne porte aucun défaut."""
+    ok = df[param].notna().to_numpy()
+    if "QC" in df.columns:
+        ok = ok & ((df["QC"].to_numpy() & masque(param)) == 0)
+    return ok
+
+
+def nettoyer(df, params=None):
+    """Remplace par NaN les valeurs marquées en défaut."""
+    if "QC" not in df.columns:
+        return df
+    qc = df["QC"].to_numpy()
+    params = [p for p in (params or MESURES) if p in df.columns]
+    return df.assign(**{p: df[p].where((qc & masque(p)) == 0) for p in params})
+
+
+def _marquer(x, t, debut_station, param):
+    """Bits de défaut de `param` sur des valeurs rangées par station puis par date."""
+    qc = np.zeros(len(x), dtype=np.uint32)
+    presente = ~np.isnan(x)
+
+    if param in PLAGES:
+        bas, haut = PLAGES[param]
+        qc[presente & ((x < bas) | (x > haut))] |= bit(param, "plage")
+
+    if param in PALIERS:
+        # Séries de valeurs identiques consécutives (NaN != NaN coupe une série)
+        identique = np.zeros(len(x), dtype=bool)
+        identique[1:] = (x[1:] == x[:-1]) & ~debut_station[1:]
+        debuts = np.flatnonzero(~identique)
+        fins = np.r_[debuts[1:], len(x)] - 1
+        bloque = (t[fins] - t[debuts]) >= pd.Timedelta(PALIERS[param]).to_timedelta64()
+        if param in BORNES_PALIER:
+            bloque &= x[debuts] != BORNES_PALIER[param]
+        qc[np.repeat(bloque, fins - debuts + 1)] |= bit(param, "palier")
+
+    if param in PICS:
+        avant = np.full(len(x), np.nan)
+        apres = np.full(len(x), np.nan)
+        avant[1:] = x[1:] - x[:-1]
+        apres[:-1] = x[:-1] - x[1:]
+        avant[debut_station] = np.nan
+        apres[np.r_[debut_station[1:], True]] = np.nan
+        with np.errstate(invalid="ignore"):
+            pic = (avant * apres > 0) & (np.minimum(np.abs(avant), np.abs(apres)) > PICS[param])
+        qc[pic] |= bit(param, "pic")
+    return qc
+
+
+def controler(df, contexte=None):
+    """Contrôle qualité d'un lot d'observations, en opérations vectorisées.
+
+    Retire les doublons (Station, DateTime) puis calcule la colonne "QC". Les
+    lignes de `contexte` (déjà contrôlées, par ex. la fenêtre en mémoire)
+    qui précèdent le lot servent aux contrôles qui regardent en arrière
+    (paliers, pics, lacunes) ; seules les lignes du lot sont retournées. La
+    dernière observation de chaque station n'a pas encore de voisine
+    suivante : elle ne peut pas être marquée comme pic.
+    """
+    if df.empty:
+        return df
+    df = dedoublonner(normaliser(df)).assign(_lot=True)
+    if contexte is not None and not contexte.empty:
+        recul = max(pd.Timedelta(p) for p in PALIERS.values()) + pd.Timedelta(hours=1)
+        queue = contexte.loc[df.index.min() - recul:]
+        queue = queue[queue["Station"].isin(df["Station"].unique())]
+        df = dedoublonner(normaliser(pd.concat([queue.assign(_lot=False), df])))
+
+    # Lignes rangées par station puis par date (tri stable d'un index déjà chronologique)
+    codes = df["Station"].cat.codes.to_numpy()
+    ordre = np.argsort(codes, kind="stable")
+    t = df.index.values[ordre]
+    debut_station = np.r_[True, codes[ordre][1:] != codes[ordre][:-1]]
+
+    qc = np.zeros(len(df), dtype=np.uint32)
+    for param in MESURES:
+        if param in df.columns:
+            qc |= _marquer(df[param].to_numpy(dtype="float64")[ordre], t, debut_station, param)
+
+    ecarts = np.zeros(len(t), dtype="timedelta64[ns]")
+    ecarts[1:] = t[1:] - t[:-1]
+    ecarts[debut_station] = np.timedelta64("NaT")
+    pas = pd.Series(ecarts).groupby(np.cumsum(debut_station)).transform("median").to_numpy()
+    with np.errstate(invalid="ignore"):
+        qc[~np.isnat(ecarts) & (ecarts > pas * FACTEUR_LACUNE)] |= LACUNE
+
+    resultat = np.empty_like(qc)
+    resultat[ordre] = qc
+    df = df.assign(QC=resultat)
+    return df[df["_lot"].to_numpy()].drop(columns="_lot")
+
+
+def _par_ligne(qc):
+    # Une valeur par mesure marquée : on compte les bits, pas les lignes
+    colonnes = {}
+    for defaut in DEFAUTS:
+        n = np.zeros(len(qc), dtype=np.int64)
+        for p in MESURES:
+            n += (qc & bit(p, defaut)) != 0
+        colonnes[defaut] = n
+    colonnes["lacunes"] = (qc & LACUNE) != 0
+    return colonnes
+
+
+def resume(df):
+    """Nombre de valeurs marquées par station et par défaut, et nombre de lacunes."""
+    if df.empty or "QC" not in df.columns:
+        return pd.DataFrame(columns=DEFAUTS + ["lacunes"])
+    return pd.DataFrame(_par_ligne(df["QC"].to_numpy()), index=df.index).groupby(df["Station"], observed=True).sum()
+
+
+class ResumesJournaliers:
+    """Résumé du contrôle qualité (voir `resume`) par station et par jour, pour les jours sur disque.
+
+    Comme les roses des vents (vent.RosesJournalieres), chaque partition
+    antérieure à la fenêtre en mémoire n'est lue qu'une fois, colonne QC
+    seule ; une plage se résume ensuite à une somme de comptes.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        # (station, jour ISO) -> comptes [défauts..., lacunes]
+        self._comptes = {}
+
+    def resume(self, start, end):
+        disque, memoire = self.dataset.decouper(start, end)
+        morceaux = []
+        if disque:
+            store = self.dataset.store
+            totaux = {}
+            for station, jour, chemin in store.partitions(*disque):
+                comptes = self._comptes.get((station, jour))
+                if comptes is None:
+                    df = store.read_partition(chemin, ["QC"])
+                    qc = df["QC"].to_numpy() if "QC" in df.columns else np.zeros(0, dtype=np.uint32)
+                    comptes = self._comptes[(station, jour)] = np.array([c.sum() for c in _par_ligne(qc).values()])
+                totaux[station] = totaux.get(station, 0) + comptes
+            if totaux:
+                morceaux.append(pd.DataFrame.from_dict(totaux, orient="index", columns=DEFAUTS + ["lacunes"]))
+        if memoire:
+            morceaux.append(resume(self.dataset.query(*memoire, columns=["QC"])))
+        morceaux = [m for m in morceaux if not m.empty]
+        if not morceaux:
+            return pd.DataFrame(columns=DEFAUTS + ["lacunes"])
+        resultat = morceaux[0] if len(morceaux) == 1 else pd.concat(morceaux).groupby(level=0, observed=True).sum()
+        return resultat.rename_axis("Station")
@@ -0,0 +1,119 @@
+import threading
+
+import pandas as pd
+
+from qc import nettoyer
+from schema import apres_filigranes, avancer_filigranes
+
+PARAMS_AGREGES = ["AIR TEMPERATURE", "HUMIDITY", "WIND SPEED", "AIR PRESSURE", "TIDE HEIGHT", "SURGE"]
+FREQUENCES = {"heure": "h", "jour": "D"}
+
+# Au-delà de ces durées (en jours), les graphiques passent aux agrégats
+SEUILS = {"heure": 7, "jour": 90}
+
+
+def resolution_pour(start_date, end_date):
+    """"jour", "heure" ou None (données brutes) selon la largeur de la plage."""
+    duree = (end_date - start_date).days
+    if duree > SEUILS["jour"]:
+        return "jour"
+    if duree > SEUILS["heure"]:
+        return "heure"
+    return None
+
+
+class Rollups:
+    """Agrégats horaires et journaliers (n, somme, min, max) par station.
+
+    Les agrégats sont mis à jour par deltas : seules les périodes touchées par
+    les nouvelles observations sont recombinées. Un filigrane par station
+    (dernier horodatage pris en compte) écarte les lignes déjà vues, les
+    deltas peuvent donc se recouvrir sans fausser les moyennes.
+    """
+
+    def __init__(self, params=PARAMS_AGREGES):
+        self.params = params
+        self.colonnes = list(params) + ["QC"]
+        self.filigranes = {}
+        self._tables = {nom: {} for nom in FREQUENCES}
+        self._lock = threading.Lock()
+
+    def charger(self, store):
+        """Reprend les agrégats enregistrés, puis y ajoute l'historique stocké plus récent.
+
+        Seules les partitions à partir du filigrane de chaque station sont
+        relues ; l'état complété est enregistré pour le démarrage suivant.
+        """
+        etat = store.load_state("rollups")
+        if etat is not None and etat["params"] == list(self.params):
+            self.filigranes, self._tables = etat["filigranes"], etat["tables"]
+        for station in store.stations():
+            filigrane = self.filigranes.get(station)
+            # Le jour du filigrane est relu en entier : update écarte les lignes déjà comptées
+            debut = filigrane.date() if filigrane is not None else None
+            self.update(store.read(start=debut, stations=[station], columns=self.colonnes))
+        with self._lock:
+            store.save_state("rollups", {"params": list(self.params), "filigranes": self.filigranes,
+                                         "tables": self._tables})
+        return self
+
+    def update(self, delta):
+        if delta.empty:
+            return
+        colonnes = [p for p in self.params if p in delta.columns]
+        delta = apres_filigranes(delta, self.filigranes)
+        if delta.empty:
+            return
+
+        # Valeurs marquées par le contrôle qualité écartées, comme sur les graphiques bruts ;
+        # sommes en float64 : elles cumulent des années d'observations float32
+        valeurs = nettoyer(delta, colonnes)[colonnes].astype("float64")
+
+        with self._lock:
+            for nom, freq in FREQUENCES.items():
+                groupes = valeurs.groupby([delta["Station"], delta.index.floor(freq).rename("DateTime")], observed=True)
+                partiel = pd.concat({"n": groupes.count(), "somme": groupes.sum(),
+                                     "min": groupes.min(), "max": groupes.max()}, axis=1)
+                for station, bloc in partiel.groupby(level="Station", observed=True):
+                    tables = self._tables[nom]
+                    tables[station] = self._combiner(tables.get(station), bloc.droplevel("Station"))
+            avancer_filigranes(delta, self.filigranes)
+
+    @staticmethod
+    def _combiner(ancien, partiel):
+        if ancien is None:
+            return partiel
+        # Seule la queue de la table peut chevaucher le delta
+        i = ancien.index.searchsorted(partiel.index.min())
+        queue = pd.concat([ancien.iloc[i:], partiel])
+        # Sélection par bloc avant le groupby : les colonnes restent sur un seul niveau
+        fusion = pd.concat({"n": queue["n"].groupby(level=0).sum(), "somme": queue["somme"].groupby(level=0).sum(),
+                            "min": queue["min"].groupby(level=0).min(), "max": queue["max"].groupby(level=0).max()},
+                           axis=1)
+        return pd.concat([ancien.iloc[:i], fusion])
+
+    def table(self, frequence, start=None, end=None, stations=None, params=None):
+        """Agrégats de [start, end) : colonnes "<param> moyenne", "<param> min", "<param> max"."""
+        with self._lock:
+            tables = dict(self._tables[frequence])
+        params = params or self.params
+        morceaux = []
+        for station in stations if stations is not None else sorted(tables):
+            t = tables.get(station)
+            if t is None:
+                continue
+            i = 0 if start is None else t.index.searchsorted(pd.Timestamp(start))
+            j = len(t) if end is None else t.index.searchsorted(pd.Timestamp(end))
+            t = t.iloc[i:j]
+            colonnes = {"Station": station}
+            for p in params:
+                if p not in t["n"].columns:
+                    continue
+                colonnes[f"{p} moyenne"] = (t["somme"][p] / t["n"][p]).astype("float32")
+                colonnes[f"{p} min"] = t["min"][p]
+                colonnes[f"{p} max"] = t["max"][p]
+            morceaux.append(pd.DataFrame(colonnes, index=t.index))
+        if not morceaux:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="DateTime"))
+        df = pd.concat(morceaux).sort_index(kind="stable")
+        return df.assign(Station=df["Station"].astype("category"))
@@ -0,0 +1,79 @@
+import pandas as pd
+
+# Mesures numériques de l'API (envoyées sous forme de texte)
+MESURES = ["TIDE HEIGHT", "WIND SPEED", "WIND DIR", "AIR PRESSURE",
+           "AIR TEMPERATURE", "DEWPOINT", "HUMIDITY", "SURGE"]
+COORDONNEES = ["Latitude", "Longitude"]
+
+
+def vide():
+    return pd.DataFrame(index=pd.DatetimeIndex([], name="DateTime"))
+
+
+def vide_type(colonnes=None):
+    """Tableau vide aux types de normaliser : "Station" et `colonnes` (toutes par défaut)."""
+    if colonnes is None:
+        colonnes = COORDONNEES + MESURES + ["QC"]
+    types = {"Station": "category", "QC": "uint32"}
+    types.update({c: "float64" for c in COORDONNEES})
+    types.update({c: "float32" for c in MESURES})
+    index = pd.DatetimeIndex([], name="DateTime")
+    return pd.DataFrame({c: pd.Series(index=index, dtype=types.get(c, "object"))
+                         for c in dict.fromkeys(["Station"] + list(colonnes))}, index=index)
+
+
+def normaliser(df):
+    """Applique le schéma typé une fois pour toutes, à l'ingestion.
+
+    - index DatetimeIndex "DateTime" trié par ordre croissant ;
+    - mesures en float32 (valeurs invalides -> NaN) ;
+    - coordonnées en float64, "Station" en catégorie ;
+    - indicateurs qualité "QC" en uint32 (0 pour les lignes non contrôlées).
+
+    Sans effet sur un tableau déjà normalisé, on peut donc la rappeler après
+    une concaténation (qui peut perdre le type catégorie).
+    """
+    if "DateTime" in df.columns:
+        df = df.assign(DateTime=pd.to_datetime(df["DateTime"])).set_index("DateTime")
+    elif not isinstance(df.index, pd.DatetimeIndex):
+        if df.empty:
+            return vide()
+        raise ValueError("colonne ou index 'DateTime' manquant")
+
+    conversions = {}
+    for col in MESURES:
+        if col in df.columns and df[col].dtype != "float32":
+            conversions[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    for col in COORDONNEES:
+        if col in df.columns and df[col].dtype != "float64":
+            conversions[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    if "QC" in df.columns and df["QC"].dtype != "uint32":
+        conversions["QC"] = df["QC"].fillna(0).astype("uint32")
+    if "Station" in df.columns and not isinstance(df["Station"].dtype, pd.CategoricalDtype):
+        conversions["Station"] = df["Station"].astype("category")
+    if conversions:
+        df = df.assign(**conversions)
+
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind="stable")
+    return df
+
+
+def dedoublonner(df):
+    """Retire les observations répétées (même station, même horodatage), garde la dernière."""
+    cles = pd.MultiIndex.from_arrays([df["Station"], df.index])
+    return df[~cles.duplicated(keep="last")]
+
+
+def apres_filigranes(df, filigranes):
+    """Lignes postérieures au filigrane (dernier horodatage déjà traité) de leur station."""
+    seuils = df["Station"].map(filigranes).astype("datetime64[ns]")
+    return df[seuils.isna().to_numpy() | (df.index > seuils.to_numpy())]
+
+
+def avancer_filigranes(df, filigranes):
+    """Avance les filigranes de `filigranes` jusqu'au dernier horodatage de chaque station de df."""
+    derniers = df.index.to_series().groupby(df["Station"], observed=True).max()
+    for station, dernier in derniers.items():
+        filigranes[station] = dernier
+    return filigranes
@@ -1,251 +1,508 @@
-import streamlit as st
-import pandas as pd
-import requests
-import plotly.express as px
-import folium
-from streamlit_folium import st_folium
-from datetime import datetime
-import sqlite3
-import uuid
-import time
-
-# Connexion à la base SQLite
-conn = sqlite3.connect("demandes.db", check_same_thread=False)
-cursor = conn.cursor()
-
-# Création table des demandes
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS demandes (
-    id TEXT PRIMARY KEY,
-    nom TEXT,
-    structure TEXT,
-    email TEXT,
-    raison TEXT,
-    statut TEXT,
-    token TEXT,
-    timestamp REAL
-)
-''')
-conn.commit()
-
-st.set_page_config(page_title="Météo Douala", layout="wide")
-st.title("🌦️ Tableau de bord MeteoMarine – Port Autonome de Douala")
-
-# Chargement données
-API_URL = "https://data-real-time-2.onrender.com/donnees?limit=50000000000"
-data = requests.get(API_URL).json()
-df = pd.DataFrame(data)
-
-df["DateTime"] = pd.to_datetime(df["DateTime"])
-df = df.sort_values("DateTime", ascending=False)
-
-# --- Filtre date ---
-st.sidebar.header("📅 Filtrer par date")
-min_date = df["DateTime"].min().date()
-max_date = df["DateTime"].max().date()
-start_date, end_date = st.sidebar.date_input("Plage de dates", [min_date, max_date])
-df = df[(df["DateTime"].dt.date >= start_date) & (df["DateTime"].dt.date <= end_date)]
-
-# --- Aperçu météo ---
-st.subheader("📍 Aperçu MeteoMarinePAD – données en Direct")
-for _, row in df.head(3).iterrows():
-    date_heure = row["DateTime"].strftime("%Y-%m-%d %H:%M:%S")
-    st.markdown(f"""
-    #### 📍 Station {row['Station']}
-    - 🕒 Observation : {date_heure}
-    - 🌡️ Température : {row['AIR TEMPERATURE']}°C
-    - 💧 Humidité : {row['HUMIDITY']}%
-    - 💨 Vent : {row['WIND SPEED']} m/s
-    - 🧭 Pression : {row['AIR PRESSURE']} hPa
-    """)
-    if "TIDE HEIGHT" in row:
-        st.markdown(f"- 🌊 Marée : {row['TIDE HEIGHT']} m")
-    if "SURGE" in row:
-        st.markdown(f"- ⚠️ SURGE : {row['SURGE']} m")
-
-# --- Carte interactive ---
-st.subheader("🗺️ Carte interactive des stations météo")
-m = folium.Map(location=[4.05, 9.68], zoom_start=10)
-stations_grouped = df.groupby("Station").first().reset_index()
-
-for _, row in stations_grouped.iterrows():
-    popup_html = f"""
-    <div style="width: 250px;">
-        <h4>📍 {row['Station']}</h4>
-        <p><b>Date :</b> {row['DateTime'].strftime("%Y-%m-%d %H:%M:%S")}</p>
-        <p><b>Température :</b> {row['AIR TEMPERATURE']} °C</p>
-        <p><b>Vent :</b> {row['WIND SPEED']} m/s</p>
-        <p><b>Humidité :</b> {row['HUMIDITY']} %</p>
-        <p><b>Pression :</b> {row['AIR PRESSURE']} hPa</p>
-    </div>
-    """
-    folium.Marker(
-        location=[row["Latitude"], row["Longitude"]],
-        popup=folium.Popup(popup_html, max_width=300),
-        tooltip=row["Station"],
-        icon=folium.Icon(color="blue", icon="cloud")
-    ).add_to(m)
-
-st_folium(m, width=900, height=500)
-
-# --- Graphiques
-st.subheader("📈 Graphique par station et paramètre")
-
-station_selected = st.selectbox("Station", df["Station"].unique())
-params = ["AIR TEMPERATURE", "HUMIDITY", "WIND SPEED", "AIR PRESSURE"]
-if "TIDE HEIGHT" in df.columns:
-    params.append("TIDE HEIGHT")
-if "SURGE" in df.columns:
-    params.append("SURGE")
-
-param = st.selectbox("Paramètre", params)
-df_station = df[df["Station"] == station_selected].copy()
-df_station[param] = pd.to_numeric(df_station[param], errors='coerce')
-df_station = df_station.dropna(subset=[param])
-if param == "TIDE HEIGHT":
-    df_station = df_station[df_station[param] >= 0.3]
-fig = px.line(df_station, x="DateTime", y=param, title=f"{param} à {station_selected}")
-st.plotly_chart(fig, use_container_width=True)
-
-# === 📊 Comparaison entre stations ===
-st.subheader("📊 Comparaison multistation")
-
-# Copie pour conversion numérique
-df_numeric = df.copy()
-for p in params:
-    df_numeric[p] = pd.to_numeric(df_numeric[p], errors='coerce')
-
-for p in params:
-    df_plot = df_numeric.dropna(subset=[p])
-    df_plot = df_plot[(df_plot["DateTime"].dt.date >= start_date) & (df_plot["DateTime"].dt.date <= end_date)]
-
-    fig = px.line(df_plot, x="DateTime", y=p, color="Station", title=f"Comparaison – {p}")
-    if p == "TIDE HEIGHT":
-        max_val = df_plot[p].max()
-        if pd.notnull(max_val):
-            fig.update_yaxes(range=[0, max_val + 0.5])
-    st.plotly_chart(fig, use_container_width=True)
-
-# --- Carte météo Windy
-st.subheader("🌐 Carte météo animée – Windy")
-st.components.v1.html('''
-<iframe width="100%" height="450" src="https://embed.windy.com/embed2.html?lat=4.05&lon=9.68&zoom=9&type=wind" frameborder="0"></iframe>
-''', height=450)
-
-# --- Demande utilisateur
-st.subheader("💾 Demande de téléchargement des données météo")
-
-with st.form("form_demande"):
-    nom = st.text_input("Votre nom")
-    structure = st.text_input("Structure")
-    email = st.text_input("Votre email")
-    raison = st.text_area("Raison de la demande")
-    submit = st.form_submit_button("Envoyer la demande")
-
-if submit:
-    if not nom or not structure or not email or not raison:
-        st.error("Tous les champs sont requis.")
-    else:
-        demande_id = str(uuid.uuid4())
-        cursor.execute('''
-            INSERT INTO demandes (id, nom, structure, email, raison, statut, token, timestamp)
-            VALUES (?, ?, ?, ?, ?, 'en attente', NULL, NULL)
-        ''', (demande_id, nom, structure, email, raison))
-        conn.commit()
-        st.success("✅ Demande envoyée. En attente de validation par l’administrateur.")
-
-# --- Vérification des droits de téléchargement
-cursor.execute('SELECT * FROM demandes WHERE email = ? AND statut = "acceptée"', (email,))
-row = cursor.fetchone()
-user_demande = None
-if row:
-    _, _, _, _, _, _, _, timestamp = row
-    if timestamp and time.time() - timestamp <= 60:
-        user_demande = row
-    else:
-        cursor.execute("UPDATE demandes SET statut = 'expirée' WHERE email = ?", (email,))
-        conn.commit()
-
-if user_demande:
-    st.success("✅ Votre demande est acceptée. Vous avez 60 secondes pour télécharger.")
-
-    export_cols = ["Station", "Latitude", "Longitude", "DateTime", "TIDE HEIGHT", "WIND SPEED", "WIND DIR",
-                   "AIR PRESSURE", "AIR TEMPERATURE", "DEWPOINT", "HUMIDITY"]
-    df_export = df[export_cols]
-    csv = df_export.to_csv(index=False).encode("utf-8")
-
-    st.download_button(
-        label="📥 Télécharger les données météo",
-        data=csv,
-        file_name="MeteoMarinePAD.csv",
-        mime="text/csv"
-    )
-else:
-    if email:
-        cursor.execute('SELECT * FROM demandes WHERE email = ? AND statut = "expirée"', (email,))
-        if cursor.fetchone():
-            st.warning("⏱️ Le lien a expiré. Veuillez refaire une demande.")
-
-# --- Interface admin
-st.sidebar.header("🔐 Admin")
-admin_password = st.sidebar.text_input("Mot de passe admin", type="password")
-
-if admin_password == "LANGOUL":
-    st.sidebar.success("Accès admin autorisé")
-    st.sidebar.markdown("### 📥 Demandes en attente")
-
-    cursor.execute("SELECT * FROM demandes WHERE statut = 'en attente'")
-    demandes_attente = cursor.fetchall()
-
-    for d in demandes_attente:
-        demande_id, nom, structure, email, raison, _, _, _ = d
-        st.sidebar.markdown(f"**{nom} ({email})**")
-        st.sidebar.markdown(f"Structure : {structure}")
-        st.sidebar.markdown(f"Raison : {raison}")
-        col1, col2 = st.sidebar.columns(2)
-        if col1.button(f"✅ Accepter {demande_id}", key=f"acc_{demande_id}"):
-            token = str(uuid.uuid4())
-            cursor.execute("UPDATE demandes SET statut='acceptée', token=?, timestamp=? WHERE id=?",
-                           (token, time.time(), demande_id))
-            conn.commit()
-            st.sidebar.success(f"Acceptée pour {nom}")
-        if col2.button(f"❌ Refuser {demande_id}", key=f"ref_{demande_id}"):
-            cursor.execute("UPDATE demandes SET statut='refusée', timestamp=? WHERE id=?",
-                           (time.time(), demande_id))
-            conn.commit()
-            st.sidebar.warning(f"Refusée pour {nom}")
-
-    # Historique
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### 📊 Historique des décisions")
-
-    cursor.execute("SELECT * FROM demandes WHERE statut IN ('acceptée', 'refusée')")
-    demandes_traitees = cursor.fetchall()
-    for d in demandes_traitees:
-        _, nom, structure, email, raison, statut, _, ts = d
-        couleur = "🟢" if statut == "acceptée" else "🔴"
-        heure = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "Inconnu"
-        st.sidebar.markdown(f"""
-        {couleur} **{nom}**  
-        📧 {email}  
-        🏢 {structure}  
-        📌 {raison}  
-        🕒 {heure}
-        """)
-
-    # Export CSV
-    cursor.execute("SELECT nom, email, structure, raison, statut, timestamp FROM demandes")
-    export_data = cursor.fetchall()
-    df_export = pd.DataFrame(export_data, columns=["nom", "email", "structure", "raison", "statut", "timestamp"])
-    df_export["Horodatage"] = df_export["timestamp"].apply(
-        lambda ts: datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "")
-    df_export = df_export.drop(columns=["timestamp"])
-    st.sidebar.download_button(
-        label="📤 Exporter l’historique",
-        data=df_export.to_csv(index=False).encode("utf-8"),
-        file_name="historique_acces.csv",
-        mime="text/csv"
-    )
-
-elif admin_password != "":
-    st.sidebar.error("Mot de passe incorrect.")
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+import json
+
+import db
+from alerte import MoteurAlertes
+from carte import CacheCarte, CacheRendus, a_jour, rendre_apercu
+from dataset import SharedDataset
+from downsample import reduire, reduire_par_station
+from export import FORMATS, construire
+from glissant import StatsGlissantes
+from jobs import EXPORT_DIR, ExportJobs
+from maree import AnalyseMaree
+from profiling import Profiler
+from rollups import Rollups, resolution_pour
+from qc import ResumesJournaliers, valide
+from schema import MESURES
+from timeindex import plage_jours
+from vent import RosesJournalieres
+
+st.set_page_config(page_title="Météo Douala", layout="wide")
+st.title("🌦️ Tableau de bord MeteoMarine – Port Autonome de Douala")
+
+
+# Mesures par section, agrégées sur toutes les sessions (METEO_PROFIL ou barre latérale admin)
+@st.cache_resource
+def get_profiler():
+    return Profiler()
+
+
+profiler = get_profiler()
+execution = profiler.execution()
+execution.etape("chargement")
+
+# Chargement données : instantané partagé par toutes les sessions,
+# rafraîchi en arrière-plan (ne pas le modifier en place)
+@st.cache_resource
+def get_dataset():
+    dataset = SharedDataset()
+    # Les vues dérivées sont abonnées avant le premier rafraîchissement
+    dataset.abonner("rollups", Rollups().charger(dataset.store))
+    dataset.abonner("alertes", MoteurAlertes()).update(dataset.snapshot().df)
+    dataset.abonner("stats", StatsGlissantes()).update(dataset.snapshot().df)
+    dataset.abonner("maree", AnalyseMaree().charger(dataset.store))
+    return dataset.start()
+
+
+@st.cache_resource
+def get_cache_carte():
+    return CacheCarte()
+
+
+@st.cache_resource
+def get_cache_apercu():
+    return CacheRendus(rendre_apercu)
+
+
+# Exports construits en arrière-plan, retrouvés par jeton d'approbation
+@st.cache_resource
+def get_export_jobs():
+    return ExportJobs()
+
+
+dataset = get_dataset()
+rollups = dataset.vues["rollups"]
+moteur_alertes = dataset.vues["alertes"]
+stats_glissantes = dataset.vues["stats"]
+analyse_maree = dataset.vues["maree"]
+export_jobs = get_export_jobs()
+cache_carte = get_cache_carte()
+cache_apercu = get_cache_apercu()
+
+# --- Filtre date ---
+execution.etape("filtre_date")
+# Seules les bornes sont lues ici : chaque section découpe sa plage par dichotomie
+# sur l'index trié (ou lit les partitions sur disque) pour ses seules colonnes
+st.sidebar.header("📅 Filtrer par date")
+min_date, max_date = dataset.bounds()
+if dataset.derniere_erreur is not None:
+    # API injoignable (démarrage à froid, panne) : on sert le dernier instantané valide
+    if min_date is None:
+        st.error(f"Source de données indisponible : {dataset.derniere_erreur}")
+        st.stop()
+    horodatage = datetime.fromtimestamp(dataset.snapshot().horodatage).strftime("%Y-%m-%d %H:%M")
+    st.warning(f"Source de données indisponible, affichage des données du {horodatage}")
+if dataset.erreurs_vues:
+    # Vue dérivée en échec (détail dans les journaux) : ses données restent celles du dernier succès
+    st.warning("Mise à jour en échec, reprise au prochain rafraîchissement : " + ", ".join(dataset.erreurs_vues))
+start_date, end_date = st.sidebar.date_input("Plage de dates", [min_date, max_date])
+# Stations connues par l'index et les dossiers du stockage, sans lire d'observation
+stations = dataset.stations()
+
+# --- Aperçu météo ---
+execution.etape("apercu")
+st.subheader("📍 Aperçu MeteoMarinePAD – données en Direct")
+# Dernière observation de chaque station (index par station), la plus récente d'abord ;
+# les cartes sont formatées en bloc et rendues à nouveau seulement quand la ligne d'une station change
+derniers = dataset.derniers(start_date, end_date).iloc[::-1]
+# Alertes et écarts courants affichés seulement à côté de l'observation qui les a produits
+alertes_actives = a_jour(derniers, moteur_alertes.etat, moteur_alertes.filigranes)
+badges = a_jour(derniers, stats_glissantes.badges, stats_glissantes.filigranes)
+for station, carte_station in cache_apercu.rendus(derniers, alertes_actives, badges):
+    st.markdown(carte_station)
+
+with st.expander("📊 Statistiques glissantes"):
+    st.dataframe(stats_glissantes.statistiques().round(3), use_container_width=True)
+
+# Indicateurs du contrôle qualité, calculés une fois à l'ingestion ; comptes
+# journaliers des jours sur disque partagés par toutes les sessions
+@st.cache_resource
+def get_resumes_qualite():
+    return ResumesJournaliers(dataset)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def resume_qualite(version, start_date, end_date):
+    return get_resumes_qualite().resume(start_date, end_date)
+
+
+with st.expander("🧪 Qualité des données"):
+    st.caption("Valeurs hors plage, capteurs bloqués (paliers), pics isolés et lacunes sur la plage sélectionnée")
+    st.dataframe(resume_qualite(dataset.snapshot().version, start_date, end_date), use_container_width=True)
+
+# Alertes calculées par le moteur de règles sur tout le réseau, à chaque rafraîchissement
+with st.expander("🚨 Historique des alertes"):
+    historique_alertes = moteur_alertes.historique
+    if historique_alertes.empty:
+        st.write("Aucune alerte.")
+    else:
+        st.dataframe(historique_alertes.iloc[::-1].head(500), use_container_width=True)
+
+# Les sections suivantes sont des fragments : un changement de leurs widgets ne
+# réexécute que la section concernée, pas le chargement ni le reste de la page.
+# Elles relisent la plage via dataset.query (dichotomie) à chaque exécution.
+params = [p for p in ["AIR TEMPERATURE", "HUMIDITY", "WIND SPEED", "AIR PRESSURE", "TIDE HEIGHT", "SURGE"]
+          if p in MESURES]
+resolution = resolution_pour(start_date, end_date)
+
+
+# --- Carte interactive ---
+@st.fragment
+def section_carte(start_date, end_date):
+    with profiler.section("carte"):
+        st.subheader("🗺️ Carte interactive des stations météo")
+        # HTML mis en cache tant que la dernière observation, les alertes et les écarts des stations ne changent pas
+        derniers = dataset.derniers(start_date, end_date)
+        html = cache_carte.html(derniers, a_jour(derniers, moteur_alertes.etat, moteur_alertes.filigranes),
+                                a_jour(derniers, stats_glissantes.badges, stats_glissantes.filigranes))
+        st.components.v1.html(html, width=900, height=500)
+
+
+# --- Graphiques
+def donnees_station(start_date, end_date, station, param):
+    """Série d'une station : brute, ou agrégée (moyenne, min, max) si la plage est large."""
+    resolution = resolution_pour(start_date, end_date)
+    if resolution:
+        df_station = rollups.table(resolution, *plage_jours(start_date, end_date), stations=[station], params=[param])
+        y_station = [f"{param} moyenne", f"{param} min", f"{param} max"]
+        return df_station.dropna(subset=y_station[:1]), y_station
+    # Les mesures sont déjà en float32 (schema.normaliser) : pas de conversion ici
+    # Valeurs manquantes ou marquées par le contrôle qualité écartées
+    df_station = dataset.query(start_date, end_date, stations=[station], columns=[param, "QC"])
+    return df_station[valide(df_station, param)], param
+
+
+# Constructeurs mis en cache sur leurs seules entrées ; `version` change à chaque
+# nouvel instantané, ce qui invalide les figures devenues obsolètes
+@st.cache_data(max_entries=64, show_spinner=False)
+def bornes_station(version, start_date, end_date, station, param):
+    df_station, _ = donnees_station(start_date, end_date, station, param)
+    if len(df_station) < 2 or df_station.index[0] == df_station.index[-1]:
+        return None
+    return df_station.index[0].to_pydatetime(), df_station.index[-1].to_pydatetime()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def figure_station(version, start_date, end_date, station, param, zoom):
+    df_station, y_station = donnees_station(start_date, end_date, station, param)
+    if zoom:
+        df_station = df_station.loc[zoom[0]:zoom[1]]
+    # Réduction à ~2 points par pixel (min/max par paquet : les pics sont conservés)
+    if y_station == param:
+        df_station = reduire(df_station, param)
+    if df_station.empty:
+        return None
+    import plotly.express as px
+    return px.line(df_station, x=df_station.index, y=y_station, title=f"{param} à {station}")
+
+
+@st.fragment
+def section_graphique_station(start_date, end_date, stations, params, resolution):
+    with profiler.section("graphique_station"):
+        st.subheader("📈 Graphique par station et paramètre")
+        station_selected = st.selectbox("Station", stations)
+        param = st.selectbox("Paramètre", params)
+        if resolution:
+            st.caption(f"Plage large : agrégats par {resolution}")
+
+        version = dataset.snapshot().version
+        # Zoom : la plage visible est rééchantillonnée côté serveur à chaque changement
+        zoom = None
+        bornes = bornes_station(version, start_date, end_date, station_selected, param)
+        if bornes:
+            zoom = st.slider(
+                "Zoom",
+                min_value=bornes[0],
+                max_value=bornes[1],
+                value=bornes,
+                format="YYYY-MM-DD HH:mm",
+                key=f"zoom_{station_selected}_{param}_{start_date}_{end_date}"
+            )
+            if zoom == bornes:
+                zoom = None
+        fig = figure_station(version, start_date, end_date, station_selected, param, zoom)
+        if fig is None:
+            st.info("Pas de mesure valide sur la plage sélectionnée.")
+            return
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# === 📊 Comparaison entre stations ===
+@st.cache_data(max_entries=16, show_spinner=False)
+def figures_comparaison(version, start_date, end_date, params):
+    resolution = resolution_pour(start_date, end_date)
+    if resolution:
+        df_agregats = rollups.table(resolution, *plage_jours(start_date, end_date), params=list(params))
+    else:
+        df = dataset.query(start_date, end_date, columns=list(params) + ["QC"])
+
+    import plotly.express as px
+    figures = []
+    for p in params:
+        if resolution:
+            y = f"{p} moyenne"
+            df_plot = df_agregats.dropna(subset=[y])
+            max_val = df_agregats[f"{p} max"].max()
+        else:
+            y = p
+            df_plot = df[valide(df, p)]
+            max_val = df_plot[p].max()
+            df_plot = reduire_par_station(df_plot, p)
+
+        fig = px.line(df_plot, x=df_plot.index, y=y, color="Station", title=f"Comparaison – {p}")
+        if p == "TIDE HEIGHT":
+            if pd.notnull(max_val):
+                fig.update_yaxes(range=[0, max_val + 0.5])
+        figures.append(fig)
+    return figures
+
+
+@st.fragment
+def section_comparaison(start_date, end_date, params):
+    with profiler.section("comparaison"):
+        st.subheader("📊 Comparaison multistation")
+        for fig in figures_comparaison(dataset.snapshot().version, start_date, end_date, tuple(params)):
+            st.plotly_chart(fig, use_container_width=True)
+
+
+# === 🌊 Marée prédite et surcote ===
+@st.cache_data(max_entries=16, show_spinner=False)
+def figures_maree(version, start_date, end_date, station):
+    if resolution_pour(start_date, end_date):
+        # Plage large : moyennes horaires, comparées à la prédiction au milieu de l'heure
+        df = rollups.table("heure", *plage_jours(start_date, end_date), stations=[station],
+                           params=["TIDE HEIGHT", "SURGE"])
+        df = df.rename(columns={"TIDE HEIGHT moyenne": "TIDE HEIGHT", "SURGE moyenne": "SURGE"})
+        df.index = df.index + pd.Timedelta(minutes=30)
+    else:
+        df = dataset.query(start_date, end_date, stations=[station], columns=["TIDE HEIGHT", "SURGE", "QC"])
+    df = df[valide(df, "TIDE HEIGHT")]
+    if df.empty:
+        return None
+    df = reduire(df.join(analyse_maree.residus(df).drop(columns="Station")).dropna(subset=["Résidu"]), "Résidu")
+
+    import plotly.express as px
+    fig_maree = px.line(df, x=df.index, y=["TIDE HEIGHT", "Marée prédite"], title=f"Marée observée et prédite à {station}")
+    fig_surcote = px.line(df, x=df.index, y=["Résidu", "SURGE"], title=f"Surcote (observé - prédit) à {station}")
+    return fig_maree, fig_surcote
+
+
+@st.fragment
+def section_maree(start_date, end_date, stations):
+    with profiler.section("maree"):
+        st.subheader("🌊 Marée prédite et surcote")
+        station = st.selectbox("Station", stations, key="station_maree")
+        figures = figures_maree(dataset.snapshot().version, start_date, end_date, station)
+        if figures is None:
+            st.info("Pas de hauteur de marée valide sur la plage sélectionnée.")
+            return
+        for fig in figures:
+            st.plotly_chart(fig, use_container_width=True)
+        with st.expander("Composantes harmoniques"):
+            st.dataframe(analyse_maree.composantes(station).round(3))
+
+
+# === 🧭 Rose des vents ===
+# Cumuls journaliers des jours sur disque, partagés par toutes les sessions
+@st.cache_resource
+def get_roses():
+    return RosesJournalieres(dataset)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def rose_vents(version, start_date, end_date, station):
+    # Jours sur disque : somme des cumuls en cache ; jours en mémoire : cumul jour par jour
+    rose = get_roses().rose(start_date, end_date, station)
+    return rose.frequences(), rose.statistiques()
+
+
+@st.fragment
+def section_vent(start_date, end_date, stations):
+    with profiler.section("vent"):
+        st.subheader("🧭 Rose des vents")
+        station = st.selectbox("Station", stations, key="station_vent")
+        snapshot = dataset.snapshot()
+        # Plage entièrement sur disque : elle ne change plus avec les rafraîchissements
+        version = snapshot.version if snapshot.debut is None or end_date >= snapshot.debut.date() else 0
+        frequences, stats = rose_vents(version, start_date, end_date, station)
+        if not stats["observations"]:
+            st.info("Pas de mesure de vent valide sur la plage sélectionnée.")
+            return
+        if "direction moyenne" in stats:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Direction moyenne", f"{stats['direction moyenne']:.0f}° ({stats['secteur dominant']})")
+            col2.metric("Constance", f"{stats['constance']:.2f}")
+            col3.metric("Vitesse moyenne", f"{stats['vitesse moyenne']:.1f} m/s")
+            col4.metric("Calmes", f"{stats['calmes %']:.1f} %")
+
+        import plotly.express as px
+        rose = frequences.reset_index().melt(id_vars="Secteur", var_name="Vitesse (m/s)", value_name="Fréquence (%)")
+        fig = px.bar_polar(rose, r="Fréquence (%)", theta="Secteur", color="Vitesse (m/s)",
+                           title=f"Rose des vents à {station}")
+        st.plotly_chart(fig, use_container_width=True)
+        with st.expander("Fréquences par secteur et classe de vitesse (%)"):
+            st.dataframe(frequences.round(2), use_container_width=True)
+
+
+# Les fragments mesurent leur propre durée, y compris lorsqu'ils sont réexécutés seuls
+execution.pause()
+section_carte(start_date, end_date)
+section_graphique_station(start_date, end_date, stations, params, resolution)
+section_comparaison(start_date, end_date, params)
+section_maree(start_date, end_date, stations)
+section_vent(start_date, end_date, stations)
+
+# --- Carte météo Windy
+execution.etape("windy")
+st.subheader("🌐 Carte météo animée – Windy")
+st.components.v1.html('''
+<iframe width="100%" height="450" src="https://embed.windy.com/embed2.html?lat=4.05&lon=9.68&zoom=9&type=wind" frameborder="0"></iframe>
+''', height=450)
+
+# --- Demande utilisateur
+execution.etape("demande")
+st.subheader("💾 Demande de téléchargement des données météo")
+
+with st.form("form_demande"):
+    nom = st.text_input("Votre nom")
+    structure = st.text_input("Structure")
+    email = st.text_input("Votre email")
+    raison = st.text_area("Raison de la demande")
+    # Le fichier sera construit sur la plage de dates de la barre latérale
+    stations_export = st.multiselect("Stations", stations, default=stations)
+    resolution_export = st.radio("Résolution", ["Brute", "Horaire", "Journalière"], horizontal=True)
+    format_export = st.radio("Format", list(FORMATS), horizontal=True)
+    submit = st.form_submit_button("Envoyer la demande")
+
+if submit:
+    if not nom or not structure or not email or not raison:
+        st.error("Tous les champs sont requis.")
+    else:
+        params_export = {"debut": start_date.isoformat(), "fin": end_date.isoformat(),
+                         "stations": stations_export, "resolution": resolution_export, "format": format_export}
+        db.creer_demande(nom, structure, email, raison, json.dumps(params_export))
+        st.success("✅ Demande envoyée. En attente de validation par l’administrateur.")
+
+# --- Vérification des droits de téléchargement
+# Le fichier est construit par un job lancé à l'acceptation : ici, simple recherche par jeton
+token = db.token_accepte(email) if email else None
+job = None
+if token:
+    job = export_jobs.get(token)
+    if job is None:
+        db.expirer(email)
+
+if job:
+    if job.statut == "en cours":
+        st.info("⏳ Votre demande est acceptée. Le fichier est en cours de préparation.")
+        st.button("🔄 Actualiser")
+    elif job.statut == "erreur":
+        st.error("La préparation du fichier a échoué. Veuillez refaire une demande.")
+    else:
+        extension, mime = FORMATS[job.format]
+        try:
+            fichier = open(job.chemin, "rb")
+        except FileNotFoundError:
+            # Fichier purgé par une autre session entre la recherche du job et son ouverture
+            db.expirer(email)
+            st.warning("⏱️ Le lien a expiré. Veuillez refaire une demande.")
+        else:
+            with fichier:
+                st.success(f"✅ Votre demande est acceptée. Vous avez {int(job.restant(export_jobs.ttl))} "
+                           f"secondes pour télécharger.")
+                st.download_button(
+                    label="📥 Télécharger les données météo",
+                    data=fichier,
+                    file_name="MeteoMarinePAD" + extension,
+                    mime=mime
+                )
+else:
+    if email:
+        if db.a_expire(email):
+            st.warning("⏱️ Le lien a expiré. Veuillez refaire une demande.")
+
+# --- Interface admin
+execution.etape("admin")
+st.sidebar.header("🔐 Admin")
+admin_password = st.sidebar.text_input("Mot de passe admin", type="password")
+
+if admin_password == "LANGOUL":
+    st.sidebar.success("Accès admin autorisé")
+    st.sidebar.markdown("### 📥 Demandes en attente")
+
+    demandes_attente = db.demandes_en_attente()
+    selection = {}
+
+    for d in demandes_attente:
+        demande_id, nom, structure, email, raison, params_export = d
+        st.sidebar.markdown(f"**{nom} ({email})**")
+        st.sidebar.markdown(f"Structure : {structure}")
+        st.sidebar.markdown(f"Raison : {raison}")
+        if st.sidebar.checkbox("Sélectionner", key=f"sel_{demande_id}"):
+            selection[demande_id] = (nom, params_export)
+
+    # Décisions groupées : une seule transaction pour toute la sélection
+    if demandes_attente:
+        col1, col2 = st.sidebar.columns(2)
+        if col1.button("✅ Accepter la sélection", disabled=not selection):
+            for demande_id, token in db.accepter(list(selection)).items():
+                nom, params_export = selection[demande_id]
+                # Anciennes demandes sans paramètres : tout l'historique disponible
+                params_export = json.loads(params_export) if params_export else \
+                    {"debut": min_date.isoformat(), "fin": max_date.isoformat()}
+                export_jobs.soumettre(token, construire, dataset, rollups, params_export, EXPORT_DIR,
+                                      format_fichier=params_export.get("format", "csv.gz"))
+                st.sidebar.success(f"Acceptée pour {nom}")
+        if col2.button("❌ Refuser la sélection", disabled=not selection):
+            db.refuser(list(selection))
+            for nom, _ in selection.values():
+                st.sidebar.warning(f"Refusée pour {nom}")
+
+    # Historique
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 📊 Historique des décisions")
+
+    TAILLE_PAGE = 20
+    page = st.sidebar.number_input("Page", min_value=1, value=1, step=1) - 1
+    demandes_traitees, total = db.historique(page, TAILLE_PAGE)
+    st.sidebar.caption(f"{total} décision(s) – page {page + 1} / {max(1, -(-total // TAILLE_PAGE))}")
+    for d in demandes_traitees:
+        nom, structure, email, raison, statut, ts = d
+        couleur = "🟢" if statut == "acceptée" else "🔴"
+        heure = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "Inconnu"
+        st.sidebar.markdown(f"""
+        {couleur} **{nom}**  
+        📧 {email}  
+        🏢 {structure}  
+        📌 {raison}  
+        🕒 {heure}
+        """)
+
+    # Export CSV
+    export_data = db.toutes_les_demandes()
+    df_export = pd.DataFrame(export_data, columns=["nom", "email", "structure", "raison", "statut", "timestamp"])
+    df_export["Horodatage"] = df_export["timestamp"].apply(
+        lambda ts: datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "")
+    df_export = df_export.drop(columns=["timestamp"])
+    st.sidebar.download_button(
+        label="📤 Exporter l’historique",
+        data=df_export.to_csv(index=False).encode("utf-8"),
+        file_name="historique_acces.csv",
+        mime="text/csv"
+    )
+
+    # Performances
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### ⏱️ Performances")
+    modes = {"Désactivée": "", "Durées": "1", "Durées + mémoire": "memoire"}
+    mode_actuel = "Durées + mémoire" if profiler.memoire else "Durées" if profiler.actif else "Désactivée"
+    mode = st.sidebar.selectbox("Instrumentation", list(modes), index=list(modes).index(mode_actuel))
+    if mode != mode_actuel:
+        profiler.configurer(modes[mode])
+    if profiler.actif:
+        st.sidebar.dataframe(profiler.statistiques(), hide_index=True)
+        st.sidebar.download_button(
+            label="📤 Exporter la trace",
+            data=json.dumps(profiler.trace()).encode("utf-8"),
+            file_name="trace_meteo.json",
+            mime="application/json"
+        )
+        if st.sidebar.button("🗑️ Vider les mesures"):
+            profiler.vider()
+
+elif admin_password != "":
+    st.sidebar.error("Mot de passe incorrect.")
+
+execution.fin()
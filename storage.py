@@ -0,0 +1,130 @@
+import os
+import pickle
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from schema import dedoublonner, normaliser, vide
+
+STORE_ROOT = os.path.join("data", "store")
+
+
+class PartitionedStore:
+    """Stockage Parquet des observations, un fichier par station et par jour.
+
+    Arborescence : <racine>/Station=<station>/date=<AAAA-MM-JJ>.parquet.
+    Une lecture sur une plage de dates n'ouvre que les partitions concernées,
+    ne charge que les colonnes demandées et passe par des lectures mmap.
+    L'état des vues dérivées (agrégats...) est enregistré dans <racine>/etat.
+    """
+
+    def __init__(self, root=STORE_ROOT):
+        self.root = root
+
+    def _dossier(self, station):
+        return os.path.join(self.root, "Station=" + quote(str(station), safe=""))
+
+    def _chemin(self, station, jour):
+        return os.path.join(self._dossier(station), f"date={jour.isoformat()}.parquet")
+
+    def stations(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(nom[len("Station="):]) for nom in os.listdir(self.root)
+                      if nom.startswith("Station="))
+
+    def partitions(self, start=None, end=None, stations=None):
+        """Liste les (station, jour, chemin) des partitions dans la plage [start, end]."""
+        debut = start.isoformat() if start else None
+        fin = end.isoformat() if end else None
+        resultat = []
+        for station in stations if stations is not None else self.stations():
+            dossier = self._dossier(station)
+            if not os.path.isdir(dossier):
+                continue
+            for nom in sorted(os.listdir(dossier)):
+                if not nom.startswith("date=") or not nom.endswith(".parquet"):
+                    continue
+                jour = nom[len("date="):-len(".parquet")]
+                # Les dates ISO se comparent directement comme des chaînes
+                if (debut and jour < debut) or (fin and jour > fin):
+                    continue
+                resultat.append((station, jour, os.path.join(dossier, nom)))
+        return resultat
+
+    def bounds(self):
+        """Premier et dernier jour stockés, sans ouvrir aucun fichier."""
+        jours = [jour for _, jour, _ in self.partitions()]
+        if not jours:
+            return None, None
+        return pd.Timestamp(min(jours)).date(), pd.Timestamp(max(jours)).date()
+
+    def last_datetime(self):
+        dernier = None
+        for station in self.stations():
+            parts = self.partitions(stations=[station])
+            if not parts:
+                continue
+            df = pd.read_parquet(parts[-1][2], columns=["Station"], memory_map=True)
+            if not df.empty and (dernier is None or df.index.max() > dernier):
+                dernier = df.index.max()
+        return dernier
+
+    def write(self, df):
+        """Ajoute des observations ; les partitions existantes sont fusionnées sans doublons."""
+        if df.empty:
+            return
+        for (station, jour), part in df.groupby([df["Station"], df.index.date], observed=True):
+            chemin = self._chemin(station, jour)
+            if os.path.exists(chemin):
+                part = dedoublonner(normaliser(pd.concat([pd.read_parquet(chemin), part])))
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            tmp = chemin + ".tmp"
+            part.to_parquet(tmp)
+            os.replace(tmp, chemin)
+
+    def _chemin_etat(self, nom):
+        return os.path.join(self.root, "etat", f"{nom}.pkl")
+
+    def save_state(self, nom, etat):
+        """Enregistre l'état d'une vue dérivée, à côté des partitions dont il est tiré."""
+        chemin = self._chemin_etat(nom)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        tmp = chemin + ".tmp"
+        with open(tmp, "wb") as fichier:
+            pickle.dump(etat, fichier, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, chemin)
+
+    def load_state(self, nom):
+        """État enregistré par `save_state`, ou None."""
+        try:
+            with open(self._chemin_etat(nom), "rb") as fichier:
+                return pickle.load(fichier)
+        except Exception:
+            # Absent, tronqué ou écrit par une version incompatible : la vue repart de zéro
+            return None
+
+    @staticmethod
+    def _lire(chemin, columns):
+        try:
+            return pd.read_parquet(chemin, columns=columns, memory_map=True)
+        except ValueError:
+            # Partition écrite avant l'ajout d'une colonne (par ex. QC) : lecture complète
+            df = pd.read_parquet(chemin, memory_map=True)
+            return df[[c for c in columns if c in df.columns]]
+
+    def read_partition(self, chemin, columns=None):
+        """Lit une seule partition (chemin donné par `partitions`), sans relister les dossiers."""
+        if columns is not None:
+            columns = list(dict.fromkeys(["Station"] + list(columns)))
+        return normaliser(self._lire(chemin, columns))
+
+    def read(self, start=None, end=None, stations=None, columns=None):
+        """Lit les observations des jours [start, end], limitées aux colonnes demandées."""
+        if columns is not None:
+            columns = list(dict.fromkeys(["Station"] + list(columns)))
+        morceaux = [self._lire(chemin, columns) for _, _, chemin in self.partitions(start, end, stations)]
+        if not morceaux:
+            return vide()
+        # L'index DateTime est restauré par les métadonnées pandas du fichier
+        return normaliser(pd.concat(morceaux))
@@ -0,0 +1,101 @@
+"""Client de l'API (client.py) contre le serveur factice (mock_api)."""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import aiohttp
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import client  # noqa: E402
+from client import ErreurAPI, LecteurJSON, recuperer  # noqa: E402
+from mock_api import MockAPI, demarrer, generer_observation  # noqa: E402
+
+
+def _dates(n):
+    return [datetime(2025, 1, 1) + timedelta(minutes=i) for i in range(n)]
+
+
+@pytest.fixture
+def serveur():
+    serveurs = []
+
+    def lancer(api):
+        serveur, api, url = demarrer(api)
+        serveurs.append(serveur)
+        return api, url
+
+    yield lancer
+    for serveur in serveurs:
+        serveur.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def sans_attente(monkeypatch):
+    # Délais entre tentatives ramenés à zéro
+    monkeypatch.setattr(client.random, "uniform", lambda a, b: 0.0)
+
+
+def test_reprise_apres_503(serveur):
+    api, url = serveur(MockAPI(n_pas=10, pannes=2))
+    df = recuperer(1000, url)
+    assert len(df) == 30
+    assert api.nb_requetes == 3
+
+
+def test_pas_de_reprise_sur_4xx(serveur):
+    api, url = serveur(MockAPI(n_pas=10))
+    with pytest.raises(aiohttp.ClientResponseError) as erreur:
+        recuperer(1000, url + "/inexistant")
+    assert erreur.value.status == 404
+    assert api.nb_requetes == 1
+
+
+def test_reponse_tronquee(serveur):
+    api, url = serveur(MockAPI(n_pas=10, tronquees=client.TENTATIVES))
+    with pytest.raises(ErreurAPI, match="tronquée"):
+        recuperer(1000, url)
+    assert api.nb_requetes == client.TENTATIVES
+
+    # Une seule réponse coupée : la tentative suivante aboutit
+    api, url = serveur(MockAPI(n_pas=10, tronquees=1))
+    assert len(recuperer(1000, url)) == 30
+
+
+def test_objet_coupe_entre_morceaux():
+    lignes = [dict(generer_observation("PAD-1", date), Station="Quai é") for date in _dates(5)]
+    corps = json.dumps(lignes, ensure_ascii=False).encode("utf-8")
+    lecteur = LecteurJSON(taille_lot=2)
+    # Un octet à la fois : objets et caractères UTF-8 coupés à toutes les positions
+    for i in range(len(corps)):
+        lecteur.alimenter(corps[i:i + 1])
+    df = lecteur.terminer()
+    assert len(df) == 5
+    assert list(df["Station"].unique()) == ["Quai é"]
+    assert df["AIR TEMPERATURE"].dtype == "float32"
+
+
+def test_corps_tronque():
+    lecteur = LecteurJSON()
+    lecteur.alimenter(json.dumps([generer_observation("PAD-1", d) for d in _dates(3)]).encode("utf-8")[:-40])
+    with pytest.raises(ErreurAPI, match="tronquée"):
+        lecteur.terminer()
+
+
+@pytest.mark.parametrize("offset", [True, False])
+def test_pagination(serveur, offset):
+    api, url = serveur(MockAPI(n_pas=1000, offset=offset))
+    df = recuperer(10 ** 6, url, page=400, concurrence=2)
+    # 3 stations x 1000 pas, sans doublon, que l'API gère `offset` ou non
+    assert len(df) == 3000
+    assert not df.reset_index().duplicated(["Station", "DateTime"]).any()
+    if offset:
+        assert api.nb_requetes == 8
+    else:
+        # Deux pages identiques, puis une seule requête de `limit` lignes
+        assert api.nb_requetes == 3
+
+    df = recuperer(1000, url, page=400, concurrence=2)
+    assert len(df) == 1000
@@ -0,0 +1,72 @@
+"""Démarrage à froid : stockage vide, API factice (mock_api)."""
+import datetime
+import os
+import sys
+import warnings
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from alerte import MoteurAlertes  # noqa: E402
+from dataset import SharedDataset  # noqa: E402
+from glissant import StatsGlissantes  # noqa: E402
+from ingestion import DeltaIngestor  # noqa: E402
+from maree import AnalyseMaree  # noqa: E402
+from mock_api import MockAPI, demarrer  # noqa: E402
+from rollups import Rollups  # noqa: E402
+from storage import PartitionedStore  # noqa: E402
+
+
+@pytest.fixture
+def api():
+    serveur, api, url = demarrer(MockAPI(n_pas=200))
+    yield api, url
+    serveur.shutdown()
+
+
+def test_vues_sur_stockage_vide(api, tmp_path):
+    _, url = api
+    store = PartitionedStore(str(tmp_path / "store"))
+    dataset = SharedDataset(DeltaIngestor(url, store, min_interval=0), interval=3600)
+    assert dataset.snapshot().df.empty
+
+    # Même enchaînement que get_dataset() dans site_PAD.py
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        dataset.abonner("rollups", Rollups().charger(dataset.store))
+        dataset.abonner("alertes", MoteurAlertes()).update(dataset.snapshot().df)
+        dataset.abonner("stats", StatsGlissantes()).update(dataset.snapshot().df)
+        dataset.abonner("maree", AnalyseMaree().charger(dataset.store))
+        dataset.start()
+    try:
+        assert dataset.derniere_erreur is None
+        assert len(dataset.snapshot().df) == 200 * 3
+        assert store.stations() == ["PAD-1", "PAD-2", "PAD-3"]
+        assert len(dataset.vues["stats"].ecarts) == 3
+        assert not dataset.vues["rollups"].table("heure").empty
+    finally:
+        dataset.stop()
+
+
+def test_tableau_de_bord_demarre(api, tmp_path, monkeypatch):
+    AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+    _, url = api
+    # Le stockage (data/store) et la base des demandes sont relatifs au répertoire courant
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("METEO_API_URL", url)
+    monkeypatch.setenv("METEO_DB", str(tmp_path / "demandes.db"))
+    # Adresse de l'API et chemin de la base sont lus à l'import
+    for module in ["ingestion", "dataset", "db"]:
+        monkeypatch.delitem(sys.modules, module, raising=False)
+
+    at = AppTest.from_file(os.path.join(RACINE, "site_PAD.py"), default_timeout=60).run()
+    assert not at.exception
+    assert os.path.isdir(tmp_path / "data" / "store")
+
+    # Plages sans aucune partition, avant la fenêtre en mémoire : brutes, horaires, journalières
+    for jours in [2, 14, 400]:
+        debut = datetime.date(2024, 11, 30) - datetime.timedelta(days=jours)
+        at.sidebar.date_input[0].set_value((debut, datetime.date(2024, 11, 30))).run()
+        assert not at.exception
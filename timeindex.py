@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+def plage_jours(start_date, end_date):
+    """Convertit une plage de jours inclusive en bornes [début, fin) horodatées."""
+    return pd.Timestamp(start_date), pd.Timestamp(end_date) + pd.Timedelta(days=1)
+
+
+class TimeIndex:
+    """Index temporel d'un tableau normalisé (DatetimeIndex trié, Station catégorielle).
+
+    Les plages sont découpées par recherche dichotomique, globalement ou par
+    station : une requête coûte O(log n) plus la taille du résultat, sans
+    construire de masque booléen sur toutes les lignes.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._temps = df.index.values
+        self._positions = {}
+        self._temps_station = {}
+        if "Station" not in df.columns or df.empty:
+            return
+        codes = df["Station"].cat.codes.to_numpy()
+        # Tri stable par station : les positions de chaque station restent chronologiques
+        ordre = np.argsort(codes, kind="stable")
+        bornes = np.searchsorted(codes[ordre], np.arange(len(df["Station"].cat.categories) + 1))
+        for i, station in enumerate(df["Station"].cat.categories):
+            positions = ordre[bornes[i]:bornes[i + 1]]
+            if len(positions):
+                self._positions[station] = positions
+                self._temps_station[station] = self._temps[positions]
+
+    @property
+    def stations(self):
+        return list(self._positions)
+
+    @staticmethod
+    def _bornes(temps, start, end):
+        i = 0 if start is None else np.searchsorted(temps, np.datetime64(pd.Timestamp(start)), "left")
+        j = len(temps) if end is None else np.searchsorted(temps, np.datetime64(pd.Timestamp(end)), "left")
+        return i, j
+
+    def slice(self, start=None, end=None, stations=None, columns=None):
+        """Lignes de [start, end), éventuellement limitées à des stations et colonnes."""
+        if stations is None:
+            i, j = self._bornes(self._temps, start, end)
+            resultat = self.df.iloc[i:j]
+        else:
+            morceaux = []
+            for station in stations:
+                if station not in self._positions:
+                    continue
+                i, j = self._bornes(self._temps_station[station], start, end)
+                morceaux.append(self._positions[station][i:j])
+            positions = np.sort(np.concatenate(morceaux)) if morceaux else np.array([], dtype=np.intp)
+            resultat = self.df.take(positions)
+        if columns is not None:
+            # Colonnes absentes (par ex. QC sur des données antérieures au contrôle qualité) ignorées
+            resultat = resultat[[c for c in dict.fromkeys(["Station"] + list(columns)) if c in resultat.columns]]
+        return resultat
+
+    def latest(self, start=None, end=None):
+        """Dernière observation de chaque station dans [start, end)."""
+        positions = []
+        for station, temps in self._temps_station.items():
+            i, j = self._bornes(temps, start, end)
+            if j > i:
+                positions.append(self._positions[station][j - 1])
+        return self.df.take(np.sort(np.array(positions, dtype=np.intp)))
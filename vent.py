@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from qc import valide
+
+# Colonnes lues pour une rose (QC : valeurs marquées écartées)
+COLONNES_VENT = ["WIND DIR", "WIND SPEED", "QC"]
+SECTEURS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSO", "SO", "OSO", "O", "ONO", "NO", "NNO"]
+# Bornes des classes de vitesse (m/s) ; en dessous de CALME, la direction n'a pas de sens
+CLASSES_VITESSE = [0.5, 2, 4, 6, 8, 10, 15, np.inf]
+CALME = 0.5
+
+
+def _libelles(classes):
+    return [f"≥ {bas:g}" if np.isinf(haut) else f"{bas:g}–{haut:g}" for bas, haut in zip(classes[:-1], classes[1:])]
+
+
+class RoseDesVents:
+    """Rose des vents et statistiques directionnelles, cumulées bloc par bloc.
+
+    Chaque bloc (par ex. une journée) est ajouté en un seul histogramme 2D
+    direction × vitesse et quelques sommes vectorielles : la mémoire reste
+    celle d'un bloc, quelle que soit la longueur de la période. WIND DIR est
+    la direction d'où vient le vent, en degrés depuis le nord.
+    """
+
+    def __init__(self, secteurs=SECTEURS, classes=CLASSES_VITESSE):
+        self.secteurs = secteurs
+        self.classes = np.asarray(classes, dtype="float64")
+        largeur = 360 / len(secteurs)
+        # Secteurs centrés sur leur direction : le premier couvre [-largeur/2, largeur/2)
+        self._bornes_direction = np.linspace(0, 360, len(secteurs) + 1)
+        self._decalage = largeur / 2
+        self.comptes = np.zeros((len(secteurs), len(self.classes) - 1))
+        self.n = 0
+        self.calmes = 0
+        self.vitesse = 0.0
+        # Sommes des vecteurs unitaires (direction seule) et des vecteurs vent (u, v)
+        self.sx = self.sy = 0.0
+        self.u = self.v = 0.0
+
+    def ajouter(self, df):
+        if df.empty:
+            return self
+        ok = valide(df, "WIND DIR") & valide(df, "WIND SPEED")
+        direction = df["WIND DIR"].to_numpy(dtype="float64")[ok] % 360
+        vitesse = df["WIND SPEED"].to_numpy(dtype="float64")[ok]
+        calme = vitesse < CALME
+        self.n += len(vitesse)
+        self.calmes += int(calme.sum())
+        self.vitesse += vitesse.sum()
+
+        direction, vitesse = direction[~calme], vitesse[~calme]
+        comptes, _, _ = np.histogram2d((direction + self._decalage) % 360, vitesse,
+                                       bins=[self._bornes_direction, self.classes])
+        self.comptes += comptes
+        radians = np.deg2rad(direction)
+        sin, cos = np.sin(radians), np.cos(radians)
+        self.sx += sin.sum()
+        self.sy += cos.sum()
+        self.u += (vitesse * sin).sum()
+        self.v += (vitesse * cos).sum()
+        return self
+
+    def cumuls(self):
+        """Histogramme et sommes d'un bloc à plat, pour les garder en cache et les additionner."""
+        return np.r_[self.comptes.ravel(), self.n, self.calmes, self.vitesse, self.sx, self.sy, self.u, self.v]
+
+    def fusionner(self, cumuls):
+        """Ajoute les cumuls (voir `cumuls`) d'un ou plusieurs blocs déjà vus."""
+        k = self.comptes.size
+        self.comptes += cumuls[:k].reshape(self.comptes.shape)
+        n, calmes, vitesse, sx, sy, u, v = cumuls[k:].tolist()
+        self.n += int(n)
+        self.calmes += int(calmes)
+        self.vitesse += vitesse
+        self.sx += sx
+        self.sy += sy
+        self.u += u
+        self.v += v
+        return self
+
+    def frequences(self):
+        """Fréquences (% de toutes les observations valides) par secteur et classe de vitesse."""
+        total = self.n or 1
+        return pd.DataFrame(self.comptes / total * 100, index=pd.Index(self.secteurs, name="Secteur"),
+                            columns=_libelles(self.classes))
+
+    def statistiques(self):
+        """Direction moyenne (circulaire), constance, vitesses moyennes et part de calmes."""
+        vents = self.n - self.calmes
+        if vents == 0:
+            return {"observations": self.n, "calmes %": 100.0 if self.n else np.nan}
+        constance = np.hypot(self.sx, self.sy) / vents
+        return {
+            "observations": self.n,
+            "direction moyenne": np.degrees(np.arctan2(self.sx, self.sy)) % 360,
+            # Longueur du vecteur moyen : 1 = direction constante, 0 = directions uniformes
+            "constance": constance,
+            "écart-type circulaire": np.degrees(np.sqrt(-2 * np.log(constance))) if constance > 0 else np.inf,
+            "direction moyenne vectorielle": np.degrees(np.arctan2(self.u, self.v)) % 360,
+            "vitesse moyenne": self.vitesse / self.n,
+            "vitesse vectorielle": np.hypot(self.u, self.v) / vents,
+            "secteur dominant": self.secteurs[int(self.comptes.sum(axis=1).argmax())],
+            "calmes %": self.calmes / self.n * 100,
+        }
+
+
+class RosesJournalieres:
+    """Cumuls de la rose des vents par station et par jour, pour les jours sur disque.
+
+    Les jours antérieurs à la fenêtre en mémoire ne changent plus : chacun
+    est lu une seule fois, puis une plage se résume à une somme de vecteurs.
+    Seuls les jours en mémoire sont recalculés à chaque nouvel instantané.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        # station -> {jour ISO: cumuls}
+        self._cumuls = {}
+
+    def rose(self, start, end, station):
+        disque, memoire = self.dataset.decouper(start, end)
+        rose = RoseDesVents()
+        if disque:
+            jours = self._jours(station, *disque)
+            if jours:
+                rose.fusionner(np.sum(jours, axis=0))
+        if memoire:
+            for bloc in self.dataset.iter_jours(*memoire, stations=[station], columns=COLONNES_VENT):
+                rose.ajouter(bloc)
+        return rose
+
+    def _jours(self, station, start, end):
+        store = self.dataset.store
+        cumuls = self._cumuls.setdefault(station, {})
+        resultat = []
+        for _, jour, _ in store.partitions(start, end, stations=[station]):
+            if jour not in cumuls:
+                date = pd.Timestamp(jour).date()
+                cumuls[jour] = RoseDesVents().ajouter(store.read(date, date, [station], COLONNES_VENT)).cumuls()
+            resultat.append(cumuls[jour])
+        return resultat